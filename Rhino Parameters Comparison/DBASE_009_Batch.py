@@ -0,0 +1,166 @@
+import pandas
+import argparse
+import glob
+import multiprocessing
+import os
+
+from DBASE_009_Rhino import ClearFolder, LoadGoldenDatabase, CompareWithGolden, GetBuildName, columns_to_import
+from DBASE_009_History import ComparisonHistory
+
+
+# Golden parameter database shared by all comparisons done in one worker process
+golden_database = None
+# Path of the golden parameter database and history database of the worker process (None = history isn't stored)
+golden_database_file_name = None
+comparison_history = None
+
+
+def InitWorker(golden, golden_file_name=None, history_file_name=None):
+    """ This function is run once in every worker process and stores the golden parameter database, so it is not
+    sent again with every compared build. Every worker opens its own connection to the history database.
+
+    Arguments:
+        golden: [dict] Golden parameter database returned by LoadGoldenDatabase function
+        golden_file_name: [str] Path of the golden parameter database (stored in the history database)
+        history_file_name: [str] Path of the history database or None (history isn't stored)
+    """
+    global golden_database, golden_database_file_name, comparison_history
+    golden_database = golden
+    golden_database_file_name = golden_file_name
+    if history_file_name is not None:
+        comparison_history = ComparisonHistory(history_file_name)
+
+
+def CompareBuild(task):
+    """ This function compares one target parameter database with the golden one and saves the report in the output
+    folder of the build. Function is run in the worker process.
+
+    Arguments:
+        task: [tuple] Path of the target parameter database, path of the output folder, by_key flag and path of the
+        folder with cached fingerprints
+    Returns:
+        summary: [dict] Build name, status and number of differences found in every column
+    """
+    file_name, output_folder, by_key, cache_folder = task
+
+    summary = {'Build': GetBuildName(file_name),
+               'Status': 'Same',
+               'Removed Parameters': 0,
+               'Added Parameters': 0}
+
+    build_record = None
+    if comparison_history is not None:
+        build_record = comparison_history.StartBuild(summary['Build'], file_name, golden_database_file_name, by_key)
+
+    try:
+        os.makedirs(output_folder)
+        differences_count, summary['Removed Parameters'], summary['Added Parameters'] = \
+            CompareWithGolden(golden_database, file_name, columns_to_import, by_key, output_folder, cache_folder,
+                              build_record)
+    except Exception as e:
+        if build_record is not None:
+            build_record.Rollback()
+        summary['Status'] = 'Error: {}'.format(str(e) or e.__class__.__name__)
+        return summary
+
+    summary.update(differences_count)
+    if differences_count or summary['Removed Parameters'] or summary['Added Parameters']:
+        summary['Status'] = 'Different'
+
+    return summary
+
+
+def CompareBuilds(golden_file_name, target_file_names, output_folder, by_key=False, processes=None,
+                  golden_cache_folder=None, history_file_name=None):
+    """ This function compares many target parameter databases with the same golden one. Golden database and its
+    fingerprints are read only once and comparisons are spread over a pool of processes. Results of every build are
+    saved in separate folder and summary of all builds is saved in Summary.csv file.
+
+    Arguments:
+        golden_file_name: [str] Path of the golden parameter database
+        target_file_names: list[str] Paths of the target parameter databases
+        output_folder: [str] Path to the folder in which results are saved
+        by_key: [bool] Align parameters on Port Number and Parameter Number instead of row position
+        processes: [int] Number of worker processes (number of cores when None)
+        golden_cache_folder: [str] Path to the folder with cached parameter databases and fingerprints or None
+        history_file_name: [str] Path of the database in which differences of every build are stored or None
+    Returns:
+        summary_df: Pandas dataframe object (one row per compared build)
+    """
+    golden = LoadGoldenDatabase(golden_file_name, columns_to_import, golden_cache_folder)
+
+    tasks = [(file_name, os.path.join(output_folder, GetBuildName(file_name)), by_key, golden_cache_folder)
+             for file_name in target_file_names]
+
+    pool = multiprocessing.Pool(processes, initializer=InitWorker,
+                                initargs=(golden, golden_file_name, history_file_name))
+    try:
+        summaries = []
+        for summary in pool.imap_unordered(CompareBuild, tasks):
+            print "Build {} compared: {}".format(summary['Build'], summary['Status'])
+            summaries.append(summary)
+    finally:
+        pool.close()
+        pool.join()
+
+    summary_columns = ['Build', 'Status', 'Removed Parameters', 'Added Parameters'] + \
+                      [column for column in columns_to_import if any(column in summary for summary in summaries)]
+    summary_df = pandas.DataFrame(summaries, columns=summary_columns).sort_values('Build')
+    summary_df[summary_columns[2:]] = summary_df[summary_columns[2:]].fillna(0).astype(int)
+
+    summary_df.to_csv(os.path.join(output_folder, 'Summary.csv'), index=False)
+    print "File Summary.csv saved successfully!"
+
+    return summary_df
+
+
+if __name__ == '__main__':
+    # Path of the original parameter database
+    rhino_file_name = 'Input\\Parameter_database_English.csv'
+    # Path of the folder in which parsed original parameter database and fingerprints are cached
+    golden_cache_folder = 'Input\\Cache'
+    # Path of the database in which differences of all compared builds are stored
+    history_file_name = 'History\\DBASE_009_History.sqlite'
+
+    parser = argparse.ArgumentParser(description='DBASE_009 - Database Parameter Test of many emulation builds')
+    parser.add_argument('targets', nargs='+',
+                        help='Folders or glob patterns of the target parameter databases, e.g. '
+                             'Input\\Parameter_database_emulation_*.csv')
+    parser.add_argument('--by-key', action='store_true',
+                        help='Align parameters on Port Number and Parameter Number instead of row position')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Number of worker processes (number of cores by default)')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Don\'t store differences in {}'.format(history_file_name))
+    arguments = parser.parse_args()
+
+    target_file_names = []
+    # The same file can be matched by more than one target, but it is compared only once
+    found_paths = set()
+    for target in arguments.targets:
+        if os.path.isdir(target):
+            target = os.path.join(target, 'Parameter_database_emulation_*.csv')
+        for file_name in sorted(glob.glob(target)):
+            path = os.path.normcase(os.path.abspath(file_name))
+            if path not in found_paths:
+                found_paths.add(path)
+                target_file_names.append(file_name)
+
+    if not target_file_names:
+        parser.error('No target parameter database found')
+
+    # Results of every build are saved in the folder named after the build, so build names must be unique
+    build_files = {}
+    for file_name in target_file_names:
+        build_files.setdefault(GetBuildName(file_name), []).append(file_name)
+    duplicated_builds = [', '.join(file_names) for file_names in build_files.values() if len(file_names) > 1]
+    if duplicated_builds:
+        parser.error('Target parameter databases with the same name found: {}'.format('; '.join(duplicated_builds)))
+
+    # Remove all files from Output folder
+    ClearFolder('Output')
+
+    compared_builds = CompareBuilds(rhino_file_name, target_file_names, 'Output', arguments.by_key,
+                                    arguments.processes, golden_cache_folder,
+                                    None if arguments.no_history else history_file_name)
+    print compared_builds.to_string(index=False)
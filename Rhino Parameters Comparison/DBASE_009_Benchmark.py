@@ -0,0 +1,254 @@
+import pandas
+import numpy
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from DBASE_009_Rhino import CompareDataframes, ReadCsvParameterDatabase, SaveComparisonReport, columns_to_import
+# Memory is measured the same way as by the profiler (stage_profiler module is found by DBASE_009_Rhino)
+from stage_profiler import GetMemoryUsage, psutil, tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # resource module doesn't exist on Windows, peak working set from psutil is used instead
+    resource = None
+
+# Time in seconds between two readings of resident memory when peak memory of the stage is sampled (Python 2)
+memory_sampling_interval = 0.005
+
+
+def GenerateParameterDatabases(template_file_name, rows_count, difference_fraction, folder_path, seed=0):
+    """ This function generates golden and target parameter databases shaped like the template database. Rows of the
+    template are repeated up to rows_count and renumbered, then given fraction of values in every compared column
+    is changed in the target database.
+
+    Arguments:
+        template_file_name: [str] Path of the parameter database used as a template
+        rows_count: [int] Number of rows of generated databases
+        difference_fraction: [float] Fraction of values changed in every compared column of target database
+        folder_path: [str] Path to the folder in which generated csv files are saved
+        seed: [int] Seed of the random generator
+    Returns:
+        golden_file_name: [str] Path of the generated golden database
+        target_file_name: [str] Path of the generated target database
+    """
+    template_df = pandas.read_csv(template_file_name, dtype=str, keep_default_na=False)
+
+    golden_df = template_df.iloc[numpy.arange(rows_count) % len(template_df)].reset_index(drop=True)
+    if rows_count != len(template_df):
+        # Every port contains 2000 parameters, so generated databases don't have repeated keys
+        golden_df['Port Number'] = (numpy.arange(rows_count) // 2000).astype(str)
+        golden_df['Parameter Number'] = (numpy.arange(rows_count) % 2000 + 1).astype(str)
+
+    target_df = golden_df.copy()
+    random_generator = numpy.random.RandomState(seed)
+    for column in columns_to_import[3:]:
+        changed = random_generator.rand(rows_count) < difference_fraction
+        values = target_df.loc[changed, column]
+        if column in ['Parameter Writable', 'Value Does Not Default']:
+            target_df.loc[changed, column] = numpy.where(values == 'True', 'False', 'True')
+        elif column == 'Parameter Unit':
+            target_df.loc[changed, column] = 'Bnch'
+        else:
+            target_df.loc[changed, column] = '12345.678'
+
+    golden_file_name = os.path.join(folder_path, 'Parameter_database_golden_{}.csv'.format(rows_count))
+    target_file_name = os.path.join(folder_path, 'Parameter_database_target_{}.csv'.format(rows_count))
+    golden_df.to_csv(golden_file_name, index=False)
+    target_df.to_csv(target_file_name, index=False)
+
+    return golden_file_name, target_file_name
+
+
+def GetPeakMemoryUsage():
+    """ This function returns the highest resident memory of the current process since it was started in bytes (or None
+    when it can't be measured).
+    """
+    if resource is not None:
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is given in bytes on macOS and in kilobytes on other systems
+        return peak_memory if sys.platform == 'darwin' else peak_memory * 1024
+    if psutil is not None:
+        return getattr(psutil.Process(os.getpid()).memory_info(), 'peak_wset', None)
+    return None
+
+
+class PeakMemorySampler(object):
+    """ This class reads resident memory of the process in a background thread and keeps the highest value, so peak
+    memory of the stage can be measured on Python 2 (which has no tracemalloc).
+    """
+
+    def __init__(self, interval=memory_sampling_interval):
+        """
+        Arguments:
+            interval: [float] Time between two readings of resident memory in seconds
+        """
+        self.interval = interval
+        self.peak_memory = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.Sample)
+        self.thread.daemon = True
+
+    def Sample(self):
+        """ This method reads resident memory until the sampler is stopped. """
+        while True:
+            memory = GetMemoryUsage()
+            if memory is not None and (self.peak_memory is None or memory > self.peak_memory):
+                self.peak_memory = memory
+            if self.stop_event.wait(self.interval):
+                break
+
+    def Start(self):
+        """ This method starts reading resident memory. """
+        self.thread.start()
+
+    def Stop(self):
+        """ This method stops reading resident memory.
+
+        Returns:
+            peak_memory: [int] The highest resident memory read in bytes (None when it can't be measured)
+        """
+        self.stop_event.set()
+        self.thread.join()
+        return self.peak_memory
+
+
+def MeasureStage(stage_function):
+    """ This function runs stage_function and measures its wall time and peak memory. Peak memory is measured with
+    tracemalloc (Python 3) or as the highest growth of resident memory during the stage (Python 2). Resident memory
+    is sampled with psutil, and the peak of the process reported by the system is used when the stage raised it.
+
+    Arguments:
+        stage_function: Function without arguments
+    Returns:
+        result: Value returned by stage_function
+        seconds: [float] Wall time of the stage
+        peak_memory: [int] Peak memory of the stage in bytes (None when it can't be measured)
+    """
+    sampler = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+    else:
+        memory_before = GetMemoryUsage()
+        process_peak_before = GetPeakMemoryUsage()
+        sampler = PeakMemorySampler()
+        sampler.Start()
+
+    start_time = time.time()
+    try:
+        result = stage_function()
+        seconds = time.time() - start_time
+    finally:
+        if sampler is not None:
+            sampled_peak = sampler.Stop()
+
+    if tracemalloc is not None:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    elif memory_before is not None:
+        peak_memory = max(sampled_peak, GetMemoryUsage())
+        process_peak_after = GetPeakMemoryUsage()
+        # New peak of the process was reached during the stage, so it is the exact peak of the stage
+        if process_peak_after is not None and process_peak_after > process_peak_before:
+            peak_memory = max(peak_memory, process_peak_after)
+        peak_memory = max(peak_memory - memory_before, 0)
+    else:
+        peak_memory = None
+
+    return result, seconds, peak_memory
+
+
+def RunBenchmark(template_file_name, rows_counts, difference_fraction, repeats):
+    """ This function runs load, compare and report stages of the comparison pipeline for every size of generated
+    parameter databases.
+
+    Arguments:
+        template_file_name: [str] Path of the parameter database used as a template
+        rows_counts: list[int] Numbers of rows of generated databases
+        difference_fraction: [float] Fraction of values changed in every compared column of target database
+        repeats: [int] Number of repeats of every stage (the fastest run is reported)
+    Returns:
+        measurements: list[dict] One record per size and stage
+    """
+    measurements = []
+    folder_path = tempfile.mkdtemp(prefix='dbase_009_benchmark_')
+
+    try:
+        for rows_count in rows_counts:
+            golden_file_name, target_file_name = GenerateParameterDatabases(template_file_name, rows_count,
+                                                                            difference_fraction, folder_path)
+            output_folder = os.path.join(folder_path, 'Output_{}'.format(rows_count))
+            os.makedirs(output_folder)
+
+            def Load():
+                return (ReadCsvParameterDatabase(golden_file_name, columns_to_import),
+                        ReadCsvParameterDatabase(target_file_name, columns_to_import))
+
+            stages = [('load', Load),
+                      ('compare', lambda: CompareDataframes(golden_df, target_df, columns_to_import, output_folder)),
+                      ('report', lambda: SaveComparisonReport(golden_df, target_df, compared_df,
+                                                              output_folder=output_folder))]
+
+            for stage_name, stage_function in stages:
+                runs = [MeasureStage(stage_function) for _ in range(repeats)]
+                result, seconds, peak_memory = min(runs, key=lambda run: run[1])
+
+                if stage_name == 'load':
+                    golden_df, target_df = result
+                elif stage_name == 'compare':
+                    compared_df = result
+
+                measurements.append({'rows': rows_count,
+                                     'difference_fraction': difference_fraction,
+                                     'stage': stage_name,
+                                     'seconds': seconds,
+                                     'peak_memory_bytes': peak_memory})
+                print "{:>10} rows  {:<8} {:10.3f} s  {} MB".format(
+                    rows_count, stage_name, seconds,
+                    '-' if peak_memory is None else '{:.1f}'.format(peak_memory / 1024.0 / 1024.0))
+    finally:
+        shutil.rmtree(folder_path)
+
+    return measurements
+
+
+if __name__ == '__main__':
+    # Path of the original parameter database used as a template of generated databases
+    rhino_file_name = 'Input\\Parameter_database_English.csv'
+
+    parser = argparse.ArgumentParser(description='DBASE_009 - Benchmark of the comparison pipeline')
+    parser.add_argument('--rows', type=int, nargs='+', default=[2462, 100000, 1000000],
+                        help='Numbers of rows of generated parameter databases')
+    parser.add_argument('--difference-fraction', type=float, default=0.01,
+                        help='Fraction of values changed in every compared column of the target database')
+    parser.add_argument('--repeats', type=int, default=1,
+                        help='Number of repeats of every stage (the fastest run is reported)')
+    parser.add_argument('--output', default=None,
+                        help='Path of the json file with results (Benchmarks\\DBASE_009_<date>.json by default)')
+    arguments = parser.parse_args()
+
+    benchmark_results = {'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                         'python': platform.python_version(),
+                         'pandas': pandas.__version__,
+                         'numpy': numpy.__version__,
+                         'platform': platform.platform(),
+                         'memory_measurement': 'tracemalloc peak' if tracemalloc is not None else 'rss peak growth',
+                         'measurements': RunBenchmark(rhino_file_name, arguments.rows,
+                                                      arguments.difference_fraction, arguments.repeats)}
+
+    results_file_name = arguments.output
+    if results_file_name is None:
+        if not os.path.exists('Benchmarks'):
+            os.makedirs('Benchmarks')
+        results_file_name = os.path.join('Benchmarks', 'DBASE_009_{}.json'.format(time.strftime('%Y%m%d_%H%M%S')))
+
+    with open(results_file_name, 'w') as f:
+        json.dump(benchmark_results, f, indent=4, sort_keys=True, separators=(',', ': '))
+    print "File {} saved successfully!".format(results_file_name)
@@ -0,0 +1,273 @@
+import pandas
+import argparse
+import contextlib
+import csv
+import os
+import re
+import time
+import urllib2
+import urlparse
+from multiprocessing.pool import ThreadPool
+
+from DBASE_009_Rhino import columns_to_import
+
+
+# Columns of the parameter database saved by DriveExaminer (Upload Params). Collected parameter tables are saved with
+# the same columns, so they can be compared by DBASE_009_Rhino.py. Columns missing in the drive response are empty.
+parameter_database_columns = ['Port Number',
+                              'Parameter Number',
+                              'Parameter Name',
+                              'Parameter Value',
+                              'Parameter Value Enum',
+                              'Parameter Max Value',
+                              'Parameter Min Value',
+                              'Parameter Default Value',
+                              'Parameter Unit',
+                              'Parameter Writable',
+                              'Value Does Not Default']
+
+# Path of the parameter table (csv) served by the drive
+parameters_path = '/parameters.csv'
+
+
+class HttpTransport(object):
+    """ This class reads parameter table from the drive over HTTP. Table is read line by line, so it is never held in
+    memory as a whole.
+    """
+
+    def __init__(self, timeout=30.0):
+        """
+        Arguments:
+            timeout: [float] Timeout of the connection and of every read in seconds
+        """
+        self.timeout = timeout
+
+    def ReadParameters(self, url):
+        """ This method yields parameters of the drive.
+
+        Arguments:
+            url: [str] Address of the drive, e.g. http://192.168.1.10:8080
+        Returns:
+            parameters: Iterator of dictionaries (column name: value as text), one per parameter
+        """
+        with contextlib.closing(urllib2.urlopen(url.rstrip('/') + parameters_path, timeout=self.timeout)) as response:
+            content_length = response.info().getheader('Content-Length')
+            received_length = [0]
+
+            def ReadLines():
+                for line in response:
+                    received_length[0] += len(line)
+                    yield line
+
+            for parameter in csv.DictReader(ReadLines()):
+                yield parameter
+
+            # Connection closed by the drive in the middle of the table is not reported by urllib2
+            if content_length is not None and received_length[0] != int(content_length):
+                raise IOError('Incomplete parameter table ({} of {} bytes received)'.format(received_length[0],
+                                                                                         content_length))
+
+
+class FileTransport(object):
+    """ This class reads parameter table saved by the drive to the file (e.g. on a network share). """
+
+    def ReadParameters(self, url):
+        """ This method yields parameters of the drive.
+
+        Arguments:
+            url: [str] Path of the parameter table or file:// url
+        Returns:
+            parameters: Iterator of dictionaries (column name: value as text), one per parameter
+        """
+        parsed_url = urlparse.urlparse(url)
+        file_name = urllib2.url2pathname(parsed_url.path) if parsed_url.scheme == 'file' else url
+
+        with open(file_name, 'rb') as parameters_file:
+            for parameter in csv.DictReader(parameters_file):
+                yield parameter
+
+
+# Transports used for the drive addresses, key = url scheme ('' for paths without scheme)
+transports = {'http': HttpTransport,
+              'file': FileTransport,
+              '': FileTransport}
+
+
+def GetTransport(url):
+    """ This function creates transport for the drive address based on its scheme.
+
+    Arguments:
+        url: [str] Address of the drive
+    Returns:
+        transport: Object with ReadParameters(url) method
+    """
+    scheme = urlparse.urlparse(url).scheme
+    # Windows paths like C:\Input\file.csv are parsed with drive letter as the scheme
+    if len(scheme) == 1:
+        scheme = ''
+    if scheme not in transports:
+        raise ValueError('Unknown transport "{}", available transports: {}'.format(
+            scheme, ', '.join(sorted(name for name in transports if name))))
+    return transports[scheme]()
+
+
+def GetDriveName(url):
+    """ This function returns name of the drive used in the name of the saved parameter database.
+
+    Arguments:
+        url: [str] Address of the drive
+    Returns:
+        drive_name: [str] Host and port (or file name) with characters other than letters and digits replaced by '_'
+    """
+    parsed_url = urlparse.urlparse(url)
+    name = parsed_url.netloc if parsed_url.netloc else os.path.splitext(os.path.basename(parsed_url.path or url))[0]
+    return re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_')
+
+
+def SaveParameters(parameters, file_name, column_names=None):
+    """ This function writes parameters to the csv file in the parameter database format. Parameters are written
+    to the temporary file, which is renamed when all parameters are written, so scripts watching the folder never read
+    incomplete file.
+
+    Arguments:
+        parameters: Iterator of dictionaries (column name: value), one per parameter
+        file_name: [str] Path of the saved parameter database
+        column_names: List of columns of the saved parameter database (parameter_database_columns when None)
+    Returns:
+        parameters_count: [int] Number of saved parameters
+    """
+    if column_names is None:
+        column_names = parameter_database_columns
+
+    temporary_file_name = file_name + '.part'
+    parameters_count = 0
+    try:
+        with open(temporary_file_name, 'wb') as parameters_file:
+            writer = csv.DictWriter(parameters_file, column_names, restval='', extrasaction='ignore',
+                                    lineterminator='\n')
+            writer.writeheader()
+            for parameter in parameters:
+                if parameters_count == 0:
+                    missing_columns = [column for column in columns_to_import if column not in parameter]
+                    if missing_columns:
+                        raise ValueError('Columns not found in the parameter table: {}'.format(
+                            ', '.join(missing_columns)))
+                writer.writerow(parameter)
+                parameters_count += 1
+
+        if parameters_count == 0:
+            raise ValueError('Parameter table is empty')
+    except Exception:
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+        raise
+
+    if os.path.exists(file_name):
+        os.remove(file_name)
+    os.rename(temporary_file_name, file_name)
+    return parameters_count
+
+
+def CollectDrive(task):
+    """ This function reads parameter table from one drive and saves it as the parameter database. Failed transfers
+    are repeated with growing delay.
+
+    Arguments:
+        task: [tuple] Drive name, drive address, path of the saved parameter database, transport (None = selected by
+        the address), number of retries and delay of the first retry in seconds
+    Returns:
+        summary: [dict] Drive name, status, number of parameters, number of attempts and transfer time
+    """
+    drive_name, url, file_name, transport, retries, retry_delay = task
+
+    summary = {'Drive': drive_name,
+               'Status': 'Collected',
+               'Parameters': 0,
+               'Attempts': 0,
+               'Seconds': 0.0}
+
+    try:
+        if transport is None:
+            transport = GetTransport(url)
+    except ValueError as e:
+        summary['Status'] = 'Error: {}'.format(e)
+        return summary
+
+    start_time = time.time()
+    for attempt in range(retries + 1):
+        summary['Attempts'] = attempt + 1
+        try:
+            summary['Parameters'] = SaveParameters(transport.ReadParameters(url), file_name)
+            summary['Status'] = 'Collected'
+            break
+        except Exception as e:
+            summary['Status'] = 'Error: {}'.format(str(e) or e.__class__.__name__)
+            if attempt < retries:
+                time.sleep(retry_delay * 2 ** attempt)
+
+    summary['Seconds'] = round(time.time() - start_time, 3)
+    return summary
+
+
+def CollectDrives(drives, output_folder, concurrency=8, retries=3, retry_delay=1.0, transport=None):
+    """ This function reads parameter tables from many drives at the same time and saves them in the output folder as
+    Parameter_database_emulation_<drive name>.csv files. Every transfer waits mostly for the drive, so transfers are
+    run in a pool of threads, which limits the number of drives read at once.
+
+    Arguments:
+        drives: list[tuple] Drive name and drive address
+        output_folder: [str] Path to the folder in which parameter databases are saved
+        concurrency: [int] Maximum number of drives read at once
+        retries: [int] Number of times failed transfer is repeated
+        retry_delay: [float] Delay of the first retry in seconds, doubled with every next retry
+        transport: Object with ReadParameters(url) method used for all drives or None (selected by the address)
+    Returns:
+        summary_df: Pandas dataframe object (one row per drive)
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    tasks = [(drive_name, url, os.path.join(output_folder, 'Parameter_database_emulation_{}.csv'.format(drive_name)),
+              transport, retries, retry_delay)
+             for drive_name, url in drives]
+
+    pool = ThreadPool(min(concurrency, len(tasks)))
+    try:
+        summaries = []
+        for summary in pool.imap_unordered(CollectDrive, tasks):
+            print "Drive {} collected: {}".format(summary['Drive'], summary['Status'])
+            summaries.append(summary)
+    finally:
+        pool.close()
+        pool.join()
+
+    return pandas.DataFrame(summaries, columns=['Drive', 'Status', 'Parameters', 'Attempts', 'Seconds']) \
+        .sort_values('Drive')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DBASE_009 - Collection of parameter databases from many drives')
+    parser.add_argument('drives', nargs='+',
+                        help='Addresses of the drives, e.g. http://192.168.1.10:8080, optionally with the name of '
+                             'the drive, e.g. 1_0_182=http://192.168.1.10:8080')
+    parser.add_argument('--output', default='Input',
+                        help='Folder in which parameter databases are saved')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Maximum number of drives read at once')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Number of times failed transfer is repeated')
+    parser.add_argument('--retry-delay', type=float, default=1.0,
+                        help='Delay of the first retry in seconds, doubled with every next retry')
+    arguments = parser.parse_args()
+
+    drives = []
+    for drive in arguments.drives:
+        match = re.match(r'^(\w+)=(.+)$', drive)
+        if match is not None:
+            drives.append((match.group(1), match.group(2)))
+        else:
+            drives.append((GetDriveName(drive), drive))
+
+    collected_drives = CollectDrives(drives, arguments.output, arguments.concurrency, arguments.retries,
+                                     arguments.retry_delay)
+    print collected_drives.to_string(index=False)
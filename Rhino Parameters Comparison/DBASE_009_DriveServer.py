@@ -0,0 +1,118 @@
+import argparse
+import BaseHTTPServer
+import os
+import random
+import shutil
+import SocketServer
+import threading
+import time
+
+from DBASE_009_Collector import parameters_path
+
+
+class DriveRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ This class answers requests sent to the emulated drive. Parameter table is the csv file of the server, sent
+    after the upload delay. Given fraction of requests fails, so retries of the collector can be tested.
+    """
+
+    def do_GET(self):
+        if self.path != parameters_path:
+            self.send_error(404, 'Unknown path {}'.format(self.path))
+            return
+
+        if random.random() < self.server.failure_rate:
+            self.send_error(503, 'Drive busy')
+            return
+
+        time.sleep(self.server.delay)
+
+        with open(self.server.parameters_file_name, 'rb') as parameters_file:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.send_header('Content-Length', str(os.fstat(parameters_file.fileno()).st_size))
+            self.end_headers()
+            shutil.copyfileobj(parameters_file, self.wfile)
+
+    def log_message(self, message_format, *arguments):
+        # Requests are not printed, the server emulates many drives at once
+        pass
+
+
+class DriveServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """ This class emulates one drive serving its parameter table over HTTP. """
+
+    daemon_threads = True
+
+    def __init__(self, port, parameters_file_name, delay=0.0, failure_rate=0.0):
+        """
+        Arguments:
+            port: [int] Port of the server (0 = any free port)
+            parameters_file_name: [str] Path of the parameter database sent by the drive
+            delay: [float] Time in seconds after which parameter table is sent (emulation of the upload)
+            failure_rate: [float] Fraction of requests answered with 503 error
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, ('localhost', port), DriveRequestHandler)
+        self.parameters_file_name = parameters_file_name
+        self.delay = delay
+        self.failure_rate = failure_rate
+
+    def GetUrl(self):
+        """ This method returns address of the drive.
+
+        Returns:
+            url: [str] Address used by the collector, e.g. http://localhost:8081
+        """
+        return 'http://{}:{}'.format(*self.server_address)
+
+
+def StartDriveServers(parameters_file_names, first_port=0, delay=0.0, failure_rate=0.0):
+    """ This function starts one emulated drive per parameter database. Every server runs in a separate thread until
+    its shutdown method is called.
+
+    Arguments:
+        parameters_file_names: list[str] Paths of the parameter databases sent by the drives
+        first_port: [int] Port of the first drive, next drives use next ports (0 = any free ports)
+        delay: [float] Time in seconds after which parameter table is sent
+        failure_rate: [float] Fraction of requests answered with 503 error
+    Returns:
+        servers: list[DriveServer] Started servers
+    """
+    servers = []
+    for index, parameters_file_name in enumerate(parameters_file_names):
+        port = first_port + index if first_port else 0
+        server = DriveServer(port, parameters_file_name, delay, failure_rate)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        servers.append(server)
+    return servers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DBASE_009 - Emulated drives serving parameter databases for '
+                                                 'DBASE_009_Collector.py')
+    parser.add_argument('databases', nargs='+',
+                        help='Parameter databases sent by the drives (one drive per file)')
+    parser.add_argument('--drives', type=int, default=1,
+                        help='Number of drives started for every parameter database')
+    parser.add_argument('--first-port', type=int, default=8081,
+                        help='Port of the first drive, next drives use next ports')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='Time in seconds after which parameter table is sent')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with 503 error')
+    arguments = parser.parse_args()
+
+    drive_servers = StartDriveServers([file_name for file_name in arguments.databases
+                                       for _ in range(arguments.drives)],
+                                      arguments.first_port, arguments.delay, arguments.failure_rate)
+    for drive_server in drive_servers:
+        print "Drive {} serving {}".format(drive_server.GetUrl(), drive_server.parameters_file_name)
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for drive_server in drive_servers:
+            drive_server.shutdown()
+        print "Drives stopped."
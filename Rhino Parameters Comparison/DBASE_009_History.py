@@ -0,0 +1,266 @@
+import pandas
+import numpy
+import argparse
+import datetime
+import os
+import sqlite3
+
+# Tables and indexes of the history database. Every comparison adds one row to the builds table and one row per
+# difference (or removed/added parameter) to the differences table.
+history_schema = ["CREATE TABLE IF NOT EXISTS builds ("
+                  "build_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                  "build_name TEXT NOT NULL, "
+                  "target_file TEXT, "
+                  "golden_file TEXT, "
+                  "by_key INTEGER, "
+                  "compared_at TEXT)",
+                  "CREATE TABLE IF NOT EXISTS differences ("
+                  "build_id INTEGER NOT NULL REFERENCES builds (build_id), "
+                  "port_number INTEGER, "
+                  "parameter_number INTEGER, "
+                  "parameter_name TEXT, "
+                  "column_name TEXT, "
+                  "expected_value, "
+                  "actual_value)",
+                  "CREATE INDEX IF NOT EXISTS builds_name ON builds (build_name)",
+                  "CREATE INDEX IF NOT EXISTS differences_build ON differences (build_id, column_name)",
+                  "CREATE INDEX IF NOT EXISTS differences_parameter_name ON differences (parameter_name, column_name)",
+                  "CREATE INDEX IF NOT EXISTS differences_parameter_key "
+                  "ON differences (parameter_number, port_number, column_name)"]
+
+# Time in seconds for which a write waits when the database is locked by another process (e.g. batch workers)
+history_lock_timeout = 60.0
+
+
+def ToSqliteValue(value):
+    """ This function converts value read from dataframe to the value which can be stored in SQLite database.
+
+    Arguments:
+        value: Value of the dataframe cell
+    Returns:
+        value: Python int, float, text or None for empty cells
+    """
+    if isinstance(value, numpy.generic):
+        value = value.item()
+    if isinstance(value, float) and numpy.isnan(value):
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class BuildRecord(object):
+    """ This class collects differences of one compared build. Rows are kept in memory during the comparison and the
+    build is written with all its rows in a single short transaction when the report is closed, so the database isn't
+    locked for other processes while the build is compared. When the build is compared in chunks, rows are written to
+    the open transaction after every chunk (Flush), so they aren't kept in memory until the end of the comparison.
+    """
+
+    def __init__(self, connection, build_values):
+        """
+        Arguments:
+            connection: [sqlite3.Connection] Connection to the history database
+            build_values: [tuple] Build name, target file, golden file, by_key flag and comparison time
+        """
+        self.connection = connection
+        self.build_values = build_values
+        self.build_id = None
+        self.rows = []
+
+    def AddRows(self, column_name, parameters_df, expected_values, actual_values):
+        """ This method adds one row per parameter.
+
+        Arguments:
+            column_name: [str] Name of the compared column (or title of removed/added parameters table)
+            parameters_df: Pandas dataframe object with Port Number, Parameter Number and Parameter Name columns
+            expected_values: Values of the golden database or None
+            actual_values: Values of the target database or None
+        """
+        rows_count = len(parameters_df)
+        if expected_values is None:
+            expected_values = [None] * rows_count
+        if actual_values is None:
+            actual_values = [None] * rows_count
+
+        self.rows.extend((ToSqliteValue(port), ToSqliteValue(number), ToSqliteValue(name), column_name,
+                          ToSqliteValue(expected), ToSqliteValue(actual))
+                         for port, number, name, expected, actual in zip(parameters_df['Port Number'].values,
+                                                                         parameters_df['Parameter Number'].values,
+                                                                         parameters_df['Parameter Name'].values,
+                                                                         expected_values, actual_values))
+
+    def AddDifferences(self, column, differences_df):
+        """ This method adds differences found in one column.
+
+        Arguments:
+            column: [str] Name of the compared column
+            differences_df: Pandas dataframe object (table of differences written to the report)
+        """
+        self.AddRows(column, differences_df, differences_df['Expected Value'].values,
+                     differences_df['Actual Value'].values)
+
+    def AddParameters(self, title, parameters_df):
+        """ This method adds parameters which exist only in one of the compared databases.
+
+        Arguments:
+            title: [str] Title of the table (e.g. Parameters removed from target), stored as the column name
+            parameters_df: Pandas dataframe object (removed or added parameters)
+        """
+        self.AddRows(title, parameters_df, None, None)
+
+    def Flush(self):
+        """ This method writes rows collected so far to the history database without committing them. The build is
+        inserted with the first written rows and the database stays locked until the build is committed or rolled back.
+        """
+        if self.build_id is None:
+            cursor = self.connection.execute("INSERT INTO builds (build_name, target_file, golden_file, by_key, "
+                                             "compared_at) VALUES (?, ?, ?, ?, ?)", self.build_values)
+            self.build_id = cursor.lastrowid
+        self.connection.executemany("INSERT INTO differences VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    ((self.build_id,) + row for row in self.rows))
+        self.rows = []
+
+    def Commit(self):
+        """ This method writes the build and all its rows to the history database.
+
+        Returns:
+            build_id: [int] Id of the build in the builds table
+        """
+        with self.connection:
+            self.Flush()
+        build_id = self.build_id
+        self.build_id = None
+        return build_id
+
+    def Rollback(self):
+        """ This method discards the build (and rows already written by Flush) when the comparison failed. """
+        if self.build_id is not None:
+            self.connection.rollback()
+            self.build_id = None
+        self.rows = []
+
+
+class ComparisonHistory(object):
+    """ This class stores results of all comparisons in SQLite database, so differences of earlier builds can be
+    queried without comparing csv files again.
+    """
+
+    def __init__(self, file_name):
+        """
+        Arguments:
+            file_name: [str] Path of the history database (created when it doesn't exist)
+        """
+        folder = os.path.dirname(file_name)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.file_name = file_name
+        self.connection = sqlite3.connect(file_name, timeout=history_lock_timeout)
+        # Parameter names read from csv files are byte strings
+        self.connection.text_factory = str
+        for statement in history_schema:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def StartBuild(self, build_name, target_file_name, golden_file_name, by_key=False):
+        """ This method starts recording of the new comparison.
+
+        Arguments:
+            build_name: [str] Name of the build (target file name without folder and extension)
+            target_file_name: [str] Path of the target parameter database
+            golden_file_name: [str] Path of the golden parameter database
+            by_key: [bool] Parameters were aligned on Port Number and Parameter Number
+        Returns:
+            build_record: [BuildRecord] Object which stores differences of the build
+        """
+        return BuildRecord(self.connection, (build_name, target_file_name, golden_file_name, int(by_key),
+                                             datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')))
+
+    def GetParameterHistory(self, parameter, column_name=None, port_number=None):
+        """ This method returns differences of one parameter in all compared builds, ordered by comparison time.
+
+        Arguments:
+            parameter: [str or int] Name or number of the parameter
+            column_name: [str] Name of the compared column or None (all columns)
+            port_number: [int] Port of the parameter or None (all ports)
+        Returns:
+            history_df: Pandas dataframe object (one row per build and column in which parameter was different)
+        """
+        if isinstance(parameter, (int, long)):
+            conditions = ["d.parameter_number = ?"]
+        else:
+            conditions = ["d.parameter_name = ?"]
+        arguments = [parameter]
+
+        if column_name is not None:
+            conditions.append("d.column_name = ?")
+            arguments.append(column_name)
+        if port_number is not None:
+            conditions.append("d.port_number = ?")
+            arguments.append(port_number)
+
+        query = ("SELECT b.build_name AS 'Build', b.compared_at AS 'Compared At', d.port_number AS 'Port Number', "
+                 "d.parameter_number AS 'Parameter Number', d.parameter_name AS 'Parameter Name', "
+                 "d.column_name AS 'Column', d.expected_value AS 'Expected Value', d.actual_value AS 'Actual Value' "
+                 "FROM differences d JOIN builds b ON b.build_id = d.build_id "
+                 "WHERE {} ORDER BY b.compared_at, b.build_id, d.port_number, d.column_name").format(
+                     ' AND '.join(conditions))
+        return pandas.read_sql_query(query, self.connection, params=arguments)
+
+    def GetDifferencesTrend(self):
+        """ This method returns number of differences found in every column of every compared build, ordered by
+        comparison time.
+
+        Returns:
+            trend_df: Pandas dataframe object (one row per build, one column per compared column)
+        """
+        query = ("SELECT b.build_id, b.build_name AS 'Build', b.compared_at AS 'Compared At', "
+                 "d.column_name AS 'Column', COUNT(d.column_name) AS 'Differences' "
+                 "FROM builds b LEFT JOIN differences d ON d.build_id = b.build_id "
+                 "GROUP BY b.build_id, d.column_name")
+        counts_df = pandas.read_sql_query(query, self.connection)
+
+        # Builds without differences have one row with empty column name, so they are kept in the trend
+        counts_df['Column'] = counts_df['Column'].fillna('')
+        trend_df = counts_df.pivot_table(index=['build_id', 'Build', 'Compared At'], columns='Column',
+                                         values='Differences', aggfunc='sum', fill_value=0)
+        trend_df = trend_df.drop([column for column in trend_df.columns if column == ''], axis=1)
+        trend_df.columns.name = None
+        trend_df = trend_df.reset_index().sort_values(['Compared At', 'build_id'])
+        return trend_df.drop('build_id', axis=1)
+
+    def Close(self):
+        """ This method closes connection to the history database. """
+        self.connection.close()
+
+
+if __name__ == '__main__':
+    # Path of the history database shared by DBASE_009_Rhino.py, DBASE_009_Batch.py and DBASE_009_Watch.py
+    history_file_name = 'History\\DBASE_009_History.sqlite'
+
+    parser = argparse.ArgumentParser(description='DBASE_009 - History of the comparison results')
+    parser.add_argument('--parameter',
+                        help='Show differences of the parameter (name or number) in all compared builds')
+    parser.add_argument('--column', default=None,
+                        help='With --parameter, show differences only in this column')
+    parser.add_argument('--port', type=int, default=None,
+                        help='With --parameter, show differences only in this port')
+    parser.add_argument('--history', default=history_file_name,
+                        help='Path of the history database')
+    arguments = parser.parse_args()
+
+    if not os.path.exists(arguments.history):
+        parser.error('History database {} not found'.format(arguments.history))
+
+    history = ComparisonHistory(arguments.history)
+    if arguments.parameter is not None:
+        parameter = int(arguments.parameter) if arguments.parameter.isdigit() else arguments.parameter
+        result_df = history.GetParameterHistory(parameter, arguments.column, arguments.port)
+    else:
+        result_df = history.GetDifferencesTrend()
+    history.Close()
+
+    if result_df.empty:
+        print "No differences found in the history."
+    else:
+        print result_df.to_string(index=False)
@@ -1,7 +1,81 @@
 import pandas
 import numpy
+import argparse
+import hashlib
+import json
 import os
+import re
 import shutil
+import sys
+
+# stage_profiler and file_hash modules are shared with the scripts located in the main folder of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from stage_profiler import profiler
+from file_hash import GetFileHash
+from DBASE_009_History import ComparisonHistory
+
+try:
+    import xlsxwriter
+except ImportError:
+    # Differences.xlsx workbook is not saved when XlsxWriter isn't installed
+    xlsxwriter = None
+
+try:
+    import pyarrow
+    cache_file_extension = '.feather'
+except ImportError:
+    # Feather format requires pyarrow, pickle is used when it isn't installed
+    pyarrow = None
+    cache_file_extension = '.pkl'
+
+# Extension of the files in which fingerprints of the parameter databases are cached
+fingerprints_file_extension = '.fingerprints.json'
+
+
+# Columns of the tables in which differences are reported
+differences_columns = ['Port Number',
+                       'Parameter Number',
+                       'Parameter Name',
+                       'Expected Value',
+                       'Actual Value']
+
+# Columns which identify a parameter in both parameter databases
+key_columns = ['Port Number',
+               'Parameter Number']
+
+# Columns that we want to import from csv files. If needed, cols can be added to the list and they will be taken
+# into account in the comparison process
+columns_to_import = ['Port Number',
+                     'Parameter Number',
+                     'Parameter Name',
+                     'Parameter Max Value',
+                     'Parameter Min Value',
+                     'Parameter Default Value',
+                     'Parameter Unit',
+                     'Parameter Writable',
+                     'Value Does Not Default']
+
+# Datatypes of the parameter database columns applied when csv file is read:
+#   unsigned - integers downcast to the smallest unsigned type (e.g. uint8 for port numbers)
+#   category - text stored once per unique value with integer codes per row
+#   boolean  - bool, or category of True/False when the column contains empty cells (nullable boolean)
+#   float64  - numbers, or category when the column contains text values like hexadecimal masks (e.g. 'FFFF')
+# Columns which are not listed here keep the datatype detected by pandas.
+parameter_database_dtypes = {'Port Number': 'unsigned',
+                             'Parameter Number': 'unsigned',
+                             'Parameter Name': 'category',
+                             'Parameter Max Value': 'float64',
+                             'Parameter Min Value': 'float64',
+                             'Parameter Default Value': 'float64',
+                             'Parameter Unit': 'category',
+                             'Parameter Writable': 'boolean',
+                             'Value Does Not Default': 'boolean'}
+
+# Absolute and relative tolerances used when numeric values are compared. Columns which are not listed here are
+# compared without any tolerance.
+column_tolerances = {'Parameter Max Value': (0.0, 1e-6),
+                     'Parameter Min Value': (0.0, 1e-6),
+                     'Parameter Default Value': (0.0, 1e-6)}
 
 
 def ClearFolder(folder_path):
@@ -11,8 +85,8 @@ def ClearFolder(folder_path):
         folder_path: [str] Path to the folder that will be cleared
     """
 
-    if not os.path.exists('Output'):
-        os.makedirs('Output')
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
 
     folder = folder_path
     for filename in os.listdir(folder):
@@ -26,7 +100,353 @@ def ClearFolder(folder_path):
             print('Failed to delete %s. Reason: %s' % (file_path, e))
 
 
-def CompareDataframes(source_df, target_df, column_names):
+def GetBuildName(file_name):
+    """ This function returns name of the build based on the name of the parameter database file.
+
+    Arguments:
+        file_name: [str] Path of the target parameter database
+    Returns:
+        build_name: [str] File name without folder and extension
+    """
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+def GetCacheFileName(file_name, column_names, cache_folder, extension):
+    """ This function returns path of the cache file of the csv file. Name of the cache file contains the key created
+    from the content of csv file, imported columns and their datatypes.
+
+    Arguments:
+        file_name: [str] Path of the csv file
+        column_names: List of imported columns
+        cache_folder: [str] Path to the folder with cache files
+        extension: [str] Extension of the cache file
+    Returns:
+        cache_file_name: [str] Path of the cache file
+    """
+    cache_key = hashlib.md5(GetFileHash(file_name) + repr(list(column_names)) +
+                            repr(sorted(parameter_database_dtypes.items()))).hexdigest()
+    return os.path.join(cache_folder, '{}.{}{}'.format(GetBuildName(file_name), cache_key, extension))
+
+
+def RemoveOutdatedCacheFiles(cache_file_name, file_name, extension):
+    """ This function removes cache files of the previous versions of the same csv file and creates cache folder if it
+    doesn't exist. Only files named <csv file name>.<md5 key><extension> are removed, so cache files of csv files with
+    dots in the name (e.g. Parameter_database_emulation_1.5.csv) are never mixed up.
+
+    Arguments:
+        cache_file_name: [str] Path of the current cache file
+        file_name: [str] Path of the csv file
+        extension: [str] Extension of the cache file
+    """
+    cache_folder, current_file_name = os.path.split(cache_file_name)
+    cache_file_pattern = re.compile(r'^{}\.[0-9a-f]{{32}}{}$'.format(re.escape(GetBuildName(file_name)),
+                                                                  re.escape(extension)))
+
+    if not os.path.exists(cache_folder):
+        os.makedirs(cache_folder)
+
+    for filename in os.listdir(cache_folder):
+        if cache_file_pattern.match(filename) and filename != current_file_name:
+            os.unlink(os.path.join(cache_folder, filename))
+
+
+def SaveCacheFile(cache_file_name, save_function):
+    """ This function saves the cache file under a temporary name and renames it when it is complete, so other
+    processes (e.g. batch workers) never read a partially written cache file.
+
+    Arguments:
+        cache_file_name: [str] Path of the cache file
+        save_function: Function which saves the cache file to the path given as its argument
+    """
+    temporary_file_name = '{}.{}.part'.format(cache_file_name, os.getpid())
+    try:
+        save_function(temporary_file_name)
+    except Exception:
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+        raise
+
+    try:
+        os.rename(temporary_file_name, cache_file_name)
+    except OSError:
+        # On Windows existing file isn't replaced. The same cache file was already saved by another process.
+        os.remove(temporary_file_name)
+
+
+def ApplyParameterDatabaseDtypes(parameters_df):
+    """ This function converts columns of the parameter database to the compact datatypes defined in
+    parameter_database_dtypes. Column is left unchanged when its values don't fit the datatype (e.g. negative numbers
+    in unsigned column).
+
+    Arguments:
+        parameters_df: Pandas dataframe object (parameter database)
+    Returns:
+        parameters_df: Pandas dataframe object with converted columns
+    """
+    for column in parameters_df.columns:
+        dtype = parameter_database_dtypes.get(column)
+        values = parameters_df[column]
+
+        if dtype == 'unsigned':
+            if pandas.api.types.is_integer_dtype(values) and (values.values >= 0).all():
+                parameters_df[column] = pandas.to_numeric(values, downcast='unsigned')
+        elif dtype == 'boolean':
+            if values.dtype != bool:
+                parameters_df[column] = values.astype('category')
+        elif dtype == 'float64':
+            if pandas.api.types.is_numeric_dtype(values):
+                parameters_df[column] = values.astype(numpy.float64)
+            else:
+                parameters_df[column] = values.astype('category')
+        elif dtype == 'category':
+            parameters_df[column] = values.astype('category')
+
+    return parameters_df
+
+
+def ReadCsvParameterDatabase(file_name, column_names):
+    """ This function reads parameter database from csv file and converts columns to the compact datatypes. Text
+    columns are read directly as categoricals.
+
+    Arguments:
+        file_name: [str] Path of the parameter database
+        column_names: List of columns to import
+    Returns:
+        parameters_df: Pandas dataframe object (parameter database)
+    """
+    category_columns = dict((column, 'category') for column in column_names
+                            if parameter_database_dtypes.get(column) == 'category')
+    parameters_df = pandas.read_csv(file_name, usecols=column_names, dtype=category_columns)
+    return ApplyParameterDatabaseDtypes(parameters_df)
+
+
+@profiler.Profiled('read parameter database')
+def ReadParameterDatabase(file_name, column_names, cache_folder=None):
+    """ This function reads parameter database from csv file. When cache_folder is provided, parsed dataframe is stored
+    in the binary columnar file in this folder and following calls read it instead of parsing csv file again. Cache
+    key is created from the content of csv file and imported columns, so cache is rebuilt when any of them changes.
+
+    Arguments:
+        file_name: [str] Path of the parameter database
+        column_names: List of columns to import
+        cache_folder: [str] Path to the folder with cached parameter databases or None (cache is not used)
+    Returns:
+        parameters_df: Pandas dataframe object (parameter database)
+    """
+    if cache_folder is None:
+        return ReadCsvParameterDatabase(file_name, column_names)
+
+    cache_file_name = GetCacheFileName(file_name, column_names, cache_folder, cache_file_extension)
+
+    if os.path.isfile(cache_file_name):
+        if pyarrow is not None:
+            return pandas.read_feather(cache_file_name)
+        return pandas.read_pickle(cache_file_name)
+
+    parameters_df = ReadCsvParameterDatabase(file_name, column_names)
+
+    RemoveOutdatedCacheFiles(cache_file_name, file_name, cache_file_extension)
+    if pyarrow is not None:
+        SaveCacheFile(cache_file_name, parameters_df.to_feather)
+    else:
+        SaveCacheFile(cache_file_name, parameters_df.to_pickle)
+
+    return parameters_df
+
+
+def GetFingerprints(parameters_df, column_names):
+    """ This function calculates fingerprint (md5 hash of the values) of every column in every port of the parameter
+    database. Ports with the same fingerprints in two databases contain the same values and don't need to be compared.
+
+    Arguments:
+        parameters_df: Pandas dataframe object (parameter database)
+        column_names: List of columns to fingerprint
+    Returns:
+        fingerprints: [dict] Dictionary with key = port number and value = dictionary with key = column name and
+        value = fingerprint
+    """
+    row_hashes = dict((column, pandas.util.hash_pandas_object(parameters_df[column], index=False).values)
+                      for column in column_names)
+
+    fingerprints = {}
+    for port, positions in parameters_df.groupby('Port Number').indices.items():
+        fingerprints[str(port)] = dict((column, hashlib.md5(row_hashes[column][positions].tobytes()).hexdigest())
+                                       for column in column_names)
+    return fingerprints
+
+
+@profiler.Profiled('fingerprints')
+def ReadFingerprints(file_name, parameters_df, column_names, cache_folder=None):
+    """ This function returns fingerprints of the parameter database. When cache_folder is provided, fingerprints are
+    stored in the json file in this folder, so they are calculated only once for every version of csv file.
+
+    Arguments:
+        file_name: [str] Path of the parameter database
+        parameters_df: Pandas dataframe object (parameter database read from file_name)
+        column_names: List of columns to fingerprint
+        cache_folder: [str] Path to the folder with cached fingerprints or None (cache is not used)
+    Returns:
+        fingerprints: [dict] Fingerprints returned by GetFingerprints function
+    """
+    if cache_folder is None:
+        return GetFingerprints(parameters_df, column_names)
+
+    cache_file_name = GetCacheFileName(file_name, column_names, cache_folder, fingerprints_file_extension)
+
+    if os.path.isfile(cache_file_name):
+        with open(cache_file_name, 'r') as f:
+            return json.load(f)
+
+    fingerprints = GetFingerprints(parameters_df, column_names)
+
+    def SaveFingerprints(fingerprints_file_name):
+        with open(fingerprints_file_name, 'w') as f:
+            json.dump(fingerprints, f)
+
+    RemoveOutdatedCacheFiles(cache_file_name, file_name, fingerprints_file_extension)
+    SaveCacheFile(cache_file_name, SaveFingerprints)
+
+    return fingerprints
+
+
+def GetChangedColumns(source_fingerprints, target_fingerprints, column_names):
+    """ This function compares fingerprints of two parameter databases and returns ports and columns which differ.
+
+    Arguments:
+        source_fingerprints: [dict] Fingerprints of the source parameter database
+        target_fingerprints: [dict] Fingerprints of the target parameter database
+        column_names: List of fingerprinted columns
+    Returns:
+        changed_columns: [dict] Dictionary with key = port number (as string) and value = list of columns which differ
+        in this port. Ports which exist only in one of the databases have all columns listed.
+    """
+    changed_columns = {}
+    for port in set(source_fingerprints) | set(target_fingerprints):
+        source_port = source_fingerprints.get(port, {})
+        target_port = target_fingerprints.get(port, {})
+        port_columns = [column for column in column_names
+                        if column not in source_port or source_port.get(column) != target_port.get(column)]
+        if port_columns:
+            changed_columns[port] = port_columns
+    return changed_columns
+
+
+def SelectChangedPorts(source_df, target_df, changed_columns, by_key):
+    """ This function leaves only rows of ports which have different fingerprints. When dataframes are compared by
+    position, rows are selected based on the ports of source dataframe, so both dataframes stay aligned.
+
+    Arguments:
+        source_df: Pandas dataframe object (source dataframe)
+        target_df: Pandas dataframe object (target dataframe)
+        changed_columns: [dict] Changed ports and columns returned by GetChangedColumns function
+        by_key: [bool] Dataframes will be aligned by key instead of row position
+    Returns:
+        source_df: Pandas dataframe object (rows of changed ports from source dataframe)
+        target_df: Pandas dataframe object (rows of changed ports from target dataframe)
+    """
+    changed_ports = list(changed_columns)
+
+    source_rows = source_df['Port Number'].astype(str).isin(changed_ports).values
+    if by_key:
+        target_rows = target_df['Port Number'].astype(str).isin(changed_ports).values
+    elif len(source_df) == len(target_df):
+        target_rows = source_rows
+    else:
+        # Length of the tables is checked by CompareDataframes function
+        return source_df, target_df
+
+    return source_df[source_rows].reset_index(drop=True), target_df[target_rows].reset_index(drop=True)
+
+
+def NormalizeCategory(value):
+    """ This function returns normalized text of the category, so values like 'Hz  ' and 'Hz' or 'false' and False
+    are treated as the same.
+
+    Arguments:
+        value: Category value
+    Returns:
+        normalized_value: [str] Normalized text of the value
+    """
+    normalized_value = str(value).strip()
+    if normalized_value.lower() in ['true', 'false']:
+        normalized_value = normalized_value.capitalize()
+    return normalized_value
+
+
+def CategoriesDiffer(source_values, target_values):
+    """ This function compares two arrays as categoricals. Only unique values (categories) are normalized and rows are
+    compared by integer category codes.
+
+    Arguments:
+        source_values: Source array or Pandas series object
+        target_values: Target array or Pandas series object
+    Returns:
+        differ: [numpy array] True where values are different
+    """
+    source_categorical = pandas.Categorical(source_values)
+    target_categorical = pandas.Categorical(target_values)
+
+    source_categories = [NormalizeCategory(value) for value in source_categorical.categories]
+    target_categories = [NormalizeCategory(value) for value in target_categorical.categories]
+    categories = pandas.Index(sorted(set(source_categories) | set(target_categories)))
+
+    # Code -1 (missing value) takes the last element of the appended array, so it stays -1
+    source_codes = numpy.append(categories.get_indexer(source_categories), -1)[source_categorical.codes]
+    target_codes = numpy.append(categories.get_indexer(target_categories), -1)[target_categorical.codes]
+
+    return source_codes != target_codes
+
+
+def GetNumbers(column):
+    """ This function converts column to float numbers, values which are not numbers are converted to NaN. Only
+    categories of the categorical column are converted.
+
+    Arguments:
+        column: Pandas series object
+    Returns:
+        numbers: [numpy array] Float values of the column
+    """
+    if pandas.api.types.is_categorical_dtype(column):
+        categories_numbers = numpy.asarray(pandas.to_numeric(column.cat.categories, errors='coerce'), dtype=float)
+        # Code -1 (missing value) takes the last element of the appended array (NaN)
+        return numpy.append(categories_numbers, numpy.nan)[column.cat.codes.values]
+    return pandas.to_numeric(column, errors='coerce').values.astype(float)
+
+
+def ColumnsDiffer(source_column, target_column, column_name):
+    """ This function compares two columns based on their datatype. Booleans are compared directly, numbers are compared
+    as floats with tolerances defined in column_tolerances and other values are compared as normalized categoricals.
+    In the text columns, values which are numbers on both sides (e.g. 650.0 and 650.00) are compared as numbers.
+
+    Arguments:
+        source_column: Pandas series object (source column)
+        target_column: Pandas series object (target column)
+        column_name: [str] Name of the compared column
+    Returns:
+        differ: [numpy array] True where values are different
+    """
+    absolute_tolerance, relative_tolerance = column_tolerances.get(column_name, (0.0, 0.0))
+
+    if source_column.dtype == bool and target_column.dtype == bool:
+        return source_column.values != target_column.values
+
+    if pandas.api.types.is_numeric_dtype(source_column) and pandas.api.types.is_numeric_dtype(target_column):
+        return ~numpy.isclose(source_column.values.astype(float), target_column.values.astype(float),
+                              rtol=relative_tolerance, atol=absolute_tolerance, equal_nan=True)
+
+    differ = CategoriesDiffer(source_column.values, target_column.values)
+
+    source_numbers = GetNumbers(source_column)
+    target_numbers = GetNumbers(target_column)
+    numeric = ~numpy.isnan(source_numbers) & ~numpy.isnan(target_numbers)
+    differ[numeric] = ~numpy.isclose(source_numbers[numeric], target_numbers[numeric],
+                                     rtol=relative_tolerance, atol=absolute_tolerance)
+
+    return differ
+
+
+@profiler.Profiled('compare')
+def CompareDataframes(source_df, target_df, column_names, output_folder='Output'):
     """ This function compares two dataframes within provided column names and returns dataframe with true
     (when difference was captured) and false (when values are the same) values.
 
@@ -34,19 +454,18 @@ def CompareDataframes(source_df, target_df, column_names):
         source_df: Pandas dataframe object (source dataframe)
         target_df: Pandas dataframe object (target dataframe)
         column_names: List of columns to compare
+        output_folder: [str] Path to the folder in which Results.txt is saved when comparison is aborted
     Returns:
         result_df: Pandas dataframe object (results from comparison)
     """
-    results_file = open('Output\\Results.txt', 'w')
-
     if len(source_df) == len(target_df):
         result_df = pandas.DataFrame(columns=column_names)
 
         for column in result_df.columns.tolist():
-            result_df[column] = numpy.where(source_df[column].astype(str) != target_df[column].astype(str),
-                                            'True', 'False')
+            result_df[column] = ColumnsDiffer(source_df[column], target_df[column], column)
         return result_df
     else:
+        results_file = open(os.path.join(output_folder, 'Results.txt'), 'w')
         print "Tables have different length! Comparison aborted."
         results_file.write("Tables have different length! Comparison aborted.")
         results_file.close()
@@ -54,123 +473,468 @@ def CompareDataframes(source_df, target_df, column_names):
         raise ValueError
 
 
-def ShowComparison(source_df, target_df, result_df):
-    """ This function analyses all true values in result_df and prints ordered differences by column name in console or
-    in txt file.
+@profiler.Profiled('align by key')
+def AlignDataframesByKey(source_df, target_df, key_columns):
+    """ This function aligns two dataframes on the key columns (hash join), so rows can be compared even if the
+    parameter databases have different length. Parameters which exist only in one of the dataframes are returned
+    separately. Repeated keys are matched in order of their occurrence.
+
+    Arguments:
+        source_df: Pandas dataframe object (source dataframe)
+        target_df: Pandas dataframe object (target dataframe)
+        key_columns: List of columns which identify a parameter
+    Returns:
+        aligned_source_df: Pandas dataframe object (source rows present in both dataframes)
+        aligned_target_df: Pandas dataframe object (target rows in the same order as aligned_source_df)
+        removed_df: Pandas dataframe object (parameters which exist only in source dataframe)
+        added_df: Pandas dataframe object (parameters which exist only in target dataframe)
+    """
+    source_keys = source_df[key_columns].copy()
+    source_keys['Source Row'] = numpy.arange(len(source_df))
+    target_keys = target_df[key_columns].copy()
+    target_keys['Target Row'] = numpy.arange(len(target_df))
+
+    # The same key can be used by more than one parameter (e.g. second block of Port 0 parameters at the end of the
+    # database), so n-th occurrence of a key in source is matched with n-th occurrence of this key in target
+    source_keys['Key Occurrence'] = source_keys.groupby(key_columns).cumcount()
+    target_keys['Key Occurrence'] = target_keys.groupby(key_columns).cumcount()
+
+    merged_keys = pandas.merge(source_keys, target_keys, how='outer', on=key_columns + ['Key Occurrence'],
+                               indicator=True)
+
+    matched_keys = merged_keys[merged_keys['_merge'] == 'both'].sort_values('Source Row')
+    removed_rows = merged_keys.loc[merged_keys['_merge'] == 'left_only', 'Source Row'].astype(int).values
+    added_rows = merged_keys.loc[merged_keys['_merge'] == 'right_only', 'Target Row'].astype(int).values
+
+    aligned_source_df = source_df.iloc[matched_keys['Source Row'].astype(int).values].reset_index(drop=True)
+    aligned_target_df = target_df.iloc[matched_keys['Target Row'].astype(int).values].reset_index(drop=True)
+
+    listed_columns = [column for column in differences_columns[:3] if column in source_df.columns]
+    removed_df = source_df.iloc[removed_rows][listed_columns].reset_index(drop=True)
+    added_df = target_df.iloc[added_rows][listed_columns].reset_index(drop=True)
+
+    return aligned_source_df, aligned_target_df, removed_df, added_df
+
+
+def GetColumnDifferences(source_df, target_df, result_df, column):
+    """ This function builds the table of differences found in one column. Rows are selected with a single boolean
+    mask, so the cost grows linearly with the number of compared rows.
 
     Arguments:
         source_df: Pandas dataframe object (source dataframe)
         target_df: Pandas dataframe object (target dataframe)
         result_df: Pandas dataframe object (results from comparison)
+        column: [str] Name of the compared column
+    Returns:
+        differences_df: Pandas dataframe object with Port Number, Parameter Number, Parameter Name, Expected Value
+        and Actual Value columns (empty when no difference was captured)
     """
-    df_to_show_columns = ['Port Number',
-                          'Parameter Number',
-                          'Parameter Name',
-                          'Expected Value',
-                          'Actual Value']
+    mask = result_df[column].values.astype(bool)
+
+    differences_df = pandas.DataFrame({'Port Number': source_df['Port Number'].values[mask],
+                                       'Parameter Number': source_df['Parameter Number'].values[mask],
+                                       'Parameter Name': source_df['Parameter Name'].values[mask],
+                                       'Expected Value': source_df[column].values[mask],
+                                       'Actual Value': target_df[column].values[mask]},
+                                      columns=differences_columns, dtype=object)
+    return differences_df
 
-    differences_found = False
 
-    results_file = open('Output\\Results.txt', 'w')
+def IterDifferences(source_df, target_df, result_df):
+    """ This function yields (column name, differences dataframe) pairs for every compared column in which at least
+    one difference was captured.
 
+    Arguments:
+        source_df: Pandas dataframe object (source dataframe)
+        target_df: Pandas dataframe object (target dataframe)
+        result_df: Pandas dataframe object (results from comparison)
+    """
     for column in result_df.columns.tolist():
-        df_to_show = pandas.DataFrame(columns=df_to_show_columns)
-        for row in range(len(result_df)):
-            if result_df[column].values[row] == 'True':
-                df_to_show = df_to_show.append({'Port Number': source_df['Port Number'].values[row],
-                                                'Parameter Number': source_df['Parameter Number'].values[row],
-                                                'Parameter Name': source_df['Parameter Name'].values[row],
-                                                'Expected Value': source_df[column].values[row],
-                                                'Actual Value': target_df[column].values[row]}, ignore_index=True)
-
-        if df_to_show.empty is False:
-            differences_found = True
-
-            results_file.write("Differences in {}".format(column))
-            results_file.write('\n')
-            results_file.write("*" * 100)
-            results_file.write('\n')
-            results_file.write(df_to_show.to_string(index=False))
-            results_file.write('\n\n')
-        else:
-            continue
-
-    if differences_found:
-        print "File Results.txt saved successfully!"
-    else:
+        differences_df = GetColumnDifferences(source_df, target_df, result_df, column)
+        if differences_df.empty is False:
+            yield column, differences_df
+
+
+class ComparisonReport(object):
+    """ This class writes comparison results in a single pass. Every table is written at the same time to the
+    Results.txt file and to the separate sheet of the Differences.xlsx workbook. Workbook is written in constant memory
+    mode (rows are flushed to the disk as soon as they are written), so the size of the report doesn't affect memory
+    usage. Workbook is created only when the first table is written.
+    """
+
+    def __init__(self, output_folder='Output', save_workbook=True, history_record=None):
+        """
+        Arguments:
+            output_folder: [str] Path to the folder in which Results.txt and Differences.xlsx are saved
+            save_workbook: [bool] Save Differences.xlsx workbook next to the Results.txt file
+            history_record: [BuildRecord] Object which stores written tables in the history database or None
+        """
+        self.output_folder = output_folder
+        self.save_workbook = save_workbook
+        self.history_record = history_record
+        self.results_file = open(os.path.join(output_folder, 'Results.txt'), 'w')
+        self.workbook = None
+        self.worksheets = {}
+        self.differences_count = {}
+        self.differences_found = False
+
+        if save_workbook and xlsxwriter is None:
+            print "XlsxWriter library is not installed. File Differences.xlsx won't be saved."
+            self.save_workbook = False
+
+    def WriteTable(self, title, sheet_name, table_df):
+        """ This method writes table to the Results.txt file and appends its rows to the sheet of the workbook.
+
+        Arguments:
+            title: [str] Title of the table in Results.txt file
+            sheet_name: [str] Name of the sheet in Differences.xlsx workbook
+            table_df: Pandas dataframe object (table to write)
+        """
+        self.differences_found = True
+
+        self.results_file.write(title)
+        self.results_file.write('\n')
+        self.results_file.write("*" * 100)
+        self.results_file.write('\n')
+        self.results_file.write(table_df.to_string(index=False))
+        self.results_file.write('\n\n')
+
+        if not self.save_workbook:
+            return
+
+        if self.workbook is None:
+            self.workbook = xlsxwriter.Workbook(os.path.join(self.output_folder, 'Differences.xlsx'),
+                                                {'constant_memory': True})
+
+        # Excel limits the length of sheet name to 31 characters
+        sheet_name = sheet_name[:31]
+        if sheet_name not in self.worksheets:
+            worksheet = self.workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, table_df.columns.tolist())
+            self.worksheets[sheet_name] = [worksheet, 1]
+        worksheet, row = self.worksheets[sheet_name]
+
+        # Empty cells are written instead of NaN values
+        rows = table_df.astype(object).where(table_df.notnull(), None).values.tolist()
+        for values in rows:
+            worksheet.write_row(row, 0, values)
+            row += 1
+        self.worksheets[sheet_name][1] = row
+
+    def WriteParameters(self, title, parameters_df):
+        """ This method writes table of parameters which exist only in one of the compared databases.
+
+        Arguments:
+            title: [str] Title of the table (used also as the name of the sheet)
+            parameters_df: Pandas dataframe object (removed or added parameters) or None
+        """
+        if parameters_df is not None and parameters_df.empty is False:
+            self.WriteTable(title, title, parameters_df)
+            if self.history_record is not None:
+                self.history_record.AddParameters(title, parameters_df)
+
+    def WriteDifferences(self, column, differences_df, rows_range=None):
+        """ This method writes table of differences found in one column.
+
+        Arguments:
+            column: [str] Name of the compared column
+            differences_df: Pandas dataframe object (differences found in the column)
+            rows_range: [tuple] First and last compared row, written in the title when comparison is done in chunks
+        """
+        title = "Differences in {}".format(column)
+        if rows_range is not None:
+            title += " (rows {}-{})".format(*rows_range)
+
+        self.differences_count[column] = self.differences_count.get(column, 0) + len(differences_df)
+        self.WriteTable(title, column, differences_df)
+        if self.history_record is not None:
+            self.history_record.AddDifferences(column, differences_df)
+
+    def WriteMessage(self, message):
+        """ This method writes message to the Results.txt file and prints it in the console.
+
+        Arguments:
+            message: [str] Message to write
+        """
+        print message
+        self.results_file.write(message)
+
+    def Flush(self):
+        """ This method flushes Results.txt file, so results written so far can be viewed during the comparison.
+        Differences collected for the history database are written to it, so they aren't kept in memory.
+        """
+        self.results_file.flush()
+        if self.history_record is not None:
+            self.history_record.Flush()
+
+    def Close(self, column_names, aborted=False):
+        """ This method finishes the report. If no difference was written, information that compared files are the
+        same is written to the Results.txt file. Differences stored in the history database are committed, or
+        discarded when the comparison was aborted.
+
+        Arguments:
+            column_names: List of compared columns
+            aborted: [bool] Comparison was aborted, the build isn't stored in the history database
+        Returns:
+            differences_count: [dict] Number of differences found in every column with differences
+        """
+        if not self.differences_found:
+            self.results_file.write('Compared files are the same based on columns: {}.'.format(column_names))
+        self.results_file.close()
         print "File Results.txt saved successfully!"
-        results_file.write('Compared files are the same based on columns: {}.'.format(columns_to_import))
 
-    results_file.close()
+        if self.workbook is not None:
+            self.workbook.close()
+            print "File Differences.xlsx saved successfully!"
+
+        if self.history_record is not None:
+            if aborted:
+                self.history_record.Rollback()
+            else:
+                self.history_record.Commit()
+
+        return self.differences_count
 
 
-def SaveComparisonInExcelFiles(source_df, target_df, result_df):
-    """ This function analyses all true values in result_df and prints ordered differences by column name
-    in excel files.
+@profiler.Profiled('report')
+def SaveComparisonReport(source_df, target_df, result_df, removed_df=None, added_df=None, output_folder='Output',
+                         save_workbook=True, column_names=None, history_record=None):
+    """ This function walks all differences captured in result_df once and saves them ordered by column name in the
+    Results.txt file and in the Differences.xlsx workbook (one sheet per column). When dataframes were aligned by key,
+    removed and added parameters are saved before differences.
 
     Arguments:
         source_df: Pandas dataframe object (source dataframe)
         target_df: Pandas dataframe object (target dataframe)
-        result_df: Pandas dataframe object (comparison results)
+        result_df: Pandas dataframe object (results from comparison)
+        removed_df: Pandas dataframe object (parameters which exist only in source dataframe) or None
+        added_df: Pandas dataframe object (parameters which exist only in target dataframe) or None
+        output_folder: [str] Path to the folder in which Results.txt and Differences.xlsx are saved
+        save_workbook: [bool] Save Differences.xlsx workbook next to the Results.txt file
+        column_names: List of columns written in the report when no difference was found (columns of result_df
+        when None)
+        history_record: [BuildRecord] Object which stores differences in the history database or None
+    Returns:
+        differences_count: [dict] Number of differences found in every column with differences
     """
-    df_to_save_columns = ['Port Number',
-                          'Parameter Number',
-                          'Parameter Name',
-                          'Expected Value',
-                          'Actual Value']
+    if column_names is None:
+        column_names = result_df.columns.tolist()
 
-    differences_found = False
+    report = ComparisonReport(output_folder, save_workbook, history_record)
 
-    for column in result_df.columns.tolist():
-        df_to_save = pandas.DataFrame(columns=df_to_save_columns)
-        for row in range(len(result_df)):
-            if result_df[column].values[row] == 'True':
-                df_to_save = df_to_save.append({'Port Number': source_df['Port Number'].values[row],
-                                                'Parameter Number': source_df['Parameter Number'].values[row],
-                                                'Parameter Name': source_df['Parameter Name'].values[row],
-                                                'Expected Value': source_df[column].values[row],
-                                                'Actual Value': target_df[column].values[row]}, ignore_index=True)
-
-        if df_to_save.empty is False:
-            differences_found = True
-            df_to_save.to_excel("Output\\Differences in {}".format(column) + '.xlsx', index=False)
-        else:
-            continue
-
-    if differences_found:
-        print "Excel files saved successfully!"
-    else:
-        print "Compared files are the same based on columns: {}.".format(columns_to_import)
+    report.WriteParameters('Parameters removed from target', removed_df)
+    report.WriteParameters('Parameters added in target', added_df)
 
+    for column, differences_df in IterDifferences(source_df, target_df, result_df):
+        report.WriteDifferences(column, differences_df)
 
-if __name__ == '__main__':
-    # Remove all files from Output folder
-    ClearFolder('Output')
+    return report.Close(column_names)
+
+
+def LoadGoldenDatabase(file_name, column_names, cache_folder=None):
+    """ This function reads golden parameter database with its file hash and fingerprints, so it can be compared with
+    many target databases.
+
+    Arguments:
+        file_name: [str] Path of the golden parameter database
+        column_names: List of columns to import
+        cache_folder: [str] Path to the folder with cached parameter databases or None (cache is not used)
+    Returns:
+        golden: [dict] Dictionary with file_hash, parameters (dataframe) and fingerprints keys
+    """
+    parameters_df = ReadParameterDatabase(file_name, column_names, cache_folder)
+
+    return {'file_hash': GetFileHash(file_name),
+            'parameters': parameters_df,
+            'fingerprints': ReadFingerprints(file_name, parameters_df, column_names, cache_folder)}
+
+
+def CreateGoldenDatabase(parameters_df, column_names):
+    """ This function creates golden parameter database from the dataframe built in memory (e.g. expected values
+    generated from HPC Database), so it can be compared with target databases without saving it to csv file.
+
+    Arguments:
+        parameters_df: Pandas dataframe object (parameter database)
+        column_names: List of compared columns
+    Returns:
+        golden: [dict] Dictionary with file_hash (None), parameters (dataframe) and fingerprints keys
+    """
+    return {'file_hash': None,
+            'parameters': parameters_df,
+            'fingerprints': GetFingerprints(parameters_df, column_names)}
+
+
+def CompareWithGolden(golden, target_file_name, column_names, by_key=False, output_folder='Output',
+                      cache_folder=None, history_record=None):
+    """ This function compares target parameter database with the golden one and saves the report in the output
+    folder. Files with the same content are not parsed at all. Otherwise only ports and columns with different
+    fingerprints are compared.
+
+    Arguments:
+        golden: [dict] Golden parameter database returned by LoadGoldenDatabase function
+        target_file_name: [str] Path of the target parameter database
+        column_names: List of columns to compare
+        by_key: [bool] Align parameters on Port Number and Parameter Number instead of row position
+        output_folder: [str] Path to the folder in which report is saved
+        cache_folder: [str] Path to the folder in which fingerprints of target database are cached or None
+        history_record: [BuildRecord] Object which stores differences in the history database or None
+    Returns:
+        differences_count: [dict] Number of differences found in every column with differences
+        removed_count: [int] Number of parameters which exist only in golden database (0 when by_key is False)
+        added_count: [int] Number of parameters which exist only in target database (0 when by_key is False)
+    """
+    if GetFileHash(target_file_name) == golden['file_hash']:
+        print "Compared files are identical."
+        return ComparisonReport(output_folder, history_record=history_record).Close(column_names), 0, 0
+
+    target_df = ReadParameterDatabase(target_file_name, column_names)
+    target_fingerprints = ReadFingerprints(target_file_name, target_df, column_names, cache_folder)
+
+    changed_columns = GetChangedColumns(golden['fingerprints'], target_fingerprints, column_names)
+    if not changed_columns:
+        print "Fingerprints of all ports are the same."
+        return ComparisonReport(output_folder, history_record=history_record).Close(column_names), 0, 0
+
+    compared_columns = [column for column in column_names
+                        if any(column in port_columns for port_columns in changed_columns.values())]
+    source_df, target_df = SelectChangedPorts(golden['parameters'], target_df, changed_columns, by_key)
+
+    removed_df = None
+    added_df = None
+    if by_key:
+        # Match parameters of both databases by Port Number and Parameter Number
+        source_df, target_df, removed_df, added_df = AlignDataframesByKey(source_df, target_df, key_columns)
 
+    compared_df = CompareDataframes(source_df, target_df, compared_columns, output_folder)
+    differences_count = SaveComparisonReport(source_df, target_df, compared_df, removed_df, added_df, output_folder,
+                                             column_names=column_names, history_record=history_record)
+
+    if by_key:
+        return differences_count, len(removed_df), len(added_df)
+    return differences_count, 0, 0
+
+
+@profiler.Profiled('chunked comparison')
+def CompareCsvFilesInChunks(source_file_name, target_file_name, column_names, chunk_size, output_folder='Output',
+                            save_workbook=True, history_record=None):
+    """ This function compares two csv files row by row reading them in aligned chunks, so the memory usage doesn't
+    depend on the size of the files. Differences found in every chunk are written to the report immediately.
+
+    Arguments:
+        source_file_name: [str] Path of the source parameter database
+        target_file_name: [str] Path of the target parameter database
+        column_names: List of columns to compare
+        chunk_size: [int] Number of rows read from both files at once
+        output_folder: [str] Path to the folder in which Results.txt and Differences.xlsx are saved
+        save_workbook: [bool] Save Differences.xlsx workbook next to the Results.txt file
+        history_record: [BuildRecord] Object which stores differences in the history database or None
+    Returns:
+        differences_count: [dict] Number of differences found in every column with differences
+    """
+    # Values are read as text, because datatypes inferred separately for every chunk could differ between the files
+    source_reader = pandas.read_csv(source_file_name, usecols=column_names, chunksize=chunk_size, dtype=str)
+    target_reader = pandas.read_csv(target_file_name, usecols=column_names, chunksize=chunk_size, dtype=str)
+
+    report = ComparisonReport(output_folder, save_workbook, history_record)
+    first_row = 0
+
+    for source_chunk in source_reader:
+        target_chunk = next(target_reader, None)
+
+        if target_chunk is None or len(target_chunk) != len(source_chunk):
+            report.WriteMessage("Tables have different length! Comparison aborted.")
+            report.Close(column_names, aborted=True)
+            raise ValueError
+
+        source_chunk = source_chunk.reset_index(drop=True)
+        target_chunk = target_chunk.reset_index(drop=True)
+        chunk_result = CompareDataframes(source_chunk, target_chunk, column_names)
+
+        for column, differences_df in IterDifferences(source_chunk, target_chunk, chunk_result):
+            report.WriteDifferences(column, differences_df, (first_row + 1, first_row + len(source_chunk)))
+        report.Flush()
+
+        first_row += len(source_chunk)
+
+    if next(target_reader, None) is not None:
+        report.WriteMessage("Tables have different length! Comparison aborted.")
+        report.Close(column_names, aborted=True)
+        raise ValueError
+
+    return report.Close(column_names)
+
+
+if __name__ == '__main__':
     # Path of the original parameter database
     rhino_file_name = 'Input\\Parameter_database_English.csv'
-    # Path of the target parameter database. This must be edited based on the current file name.
+    # Path of the target parameter database. This must be edited based on the current file name or passed
+    # with --target argument.
     emulated_rhino_file_name = 'Input\\Parameter_database_emulation_1_0_181.csv'
+    # Path of the folder in which parsed original parameter database and fingerprints are cached
+    golden_cache_folder = 'Input\\Cache'
+    # Path of the database in which differences of all compared builds are stored
+    history_file_name = 'History\\DBASE_009_History.sqlite'
+
+    parser = argparse.ArgumentParser(description='DBASE_009 - Database Parameter Test')
+    parser.add_argument('--target', default=emulated_rhino_file_name,
+                        help='Path of the target parameter database downloaded from the DUT')
+    parser.add_argument('--by-key', action='store_true',
+                        help='Align parameters on Port Number and Parameter Number instead of row position. '
+                             'Added and removed parameters are reported separately.')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Compare files row by row reading only this number of rows at once. Use it for '
+                             'parameter databases which don\'t fit in memory.')
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure time, rows and memory of every stage and save summary in Output\\Profile.json')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='With --profile, save cProfile statistics of the slowest stage in '
+                             'Output\\SlowestStage.prof')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Don\'t store differences in {}'.format(history_file_name))
+    arguments = parser.parse_args()
+
+    if arguments.profile:
+        profiler.Enable(arguments.cprofile)
+
+    if arguments.chunk_size is not None and arguments.chunk_size <= 0:
+        parser.error('--chunk-size must be a positive number of rows')
+
+    if arguments.by_key and arguments.chunk_size is not None:
+        parser.error('--by-key and --chunk-size cannot be used together')
+
+    # Remove all files from Output folder
+    ClearFolder('Output')
 
-    # Columns that we want to import from csv files. If needed, cols can be added to the list and they will be taken
-    # into account in the comparison process
-    columns_to_import = ['Port Number',
-                         'Parameter Number',
-                         'Parameter Name',
-                         'Parameter Max Value',
-                         'Parameter Min Value',
-                         'Parameter Default Value',
-                         'Parameter Unit',
-                         'Parameter Writable',
-                         'Value Does Not Default']
-
-    # Create dataframes by reading original and compared parameter databases
-    rhino_params = pandas.read_csv(rhino_file_name, usecols=columns_to_import)
-    emulated_rhino_params = pandas.read_csv(emulated_rhino_file_name, usecols=columns_to_import)
-
-    # Perform comparison and save result in dataframe
-    compared_df = CompareDataframes(rhino_params, emulated_rhino_params, columns_to_import)
-    # Print comparison results to the Results.txt file
-    ShowComparison(rhino_params, emulated_rhino_params, compared_df)
-    # This function can be used to export results separately to different excel files
-    # SaveComparisonInExcelFiles(rhino_params, emulated_rhino_params, compared_df)
+    # Differences are also appended to the history database, which isn't cleared with Output folder
+    history = None
+    build_record = None
+    if not arguments.no_history:
+        history = ComparisonHistory(history_file_name)
+        build_record = history.StartBuild(GetBuildName(arguments.target), arguments.target, rhino_file_name,
+                                          arguments.by_key)
+
+    if arguments.chunk_size is not None:
+        # Stream both databases and write differences to the report as they are found
+        CompareCsvFilesInChunks(rhino_file_name, arguments.target, columns_to_import, arguments.chunk_size, 'Output',
+                                history_record=build_record)
+    else:
+        # Read original parameter database and its fingerprints (from cache when csv file wasn't changed)
+        golden_database = LoadGoldenDatabase(rhino_file_name, columns_to_import, golden_cache_folder)
+
+        # Compare target parameter database with the original one and save comparison results to the Results.txt
+        # file and Differences.xlsx workbook
+        CompareWithGolden(golden_database, arguments.target, columns_to_import, arguments.by_key, 'Output',
+                          golden_cache_folder, build_record)
+
+    if history is not None:
+        history.Close()
+
+    if arguments.profile:
+        profiler.SaveSummary('Output\\Profile.json')
+        print "File Profile.json saved successfully!"
+        for stage in profiler.Summary():
+            print "{:<25} {:>4} calls {:10.3f} s".format(stage['stage'], stage['calls'], stage['seconds'])
+
+        slowest_stage = profiler.SaveSlowestStageProfile('Output\\SlowestStage.prof')
+        if slowest_stage is not None:
+            print "File SlowestStage.prof saved successfully! (stage: {})".format(slowest_stage)
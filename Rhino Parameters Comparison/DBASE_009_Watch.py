@@ -0,0 +1,152 @@
+import argparse
+import glob
+import os
+import time
+
+from DBASE_009_Rhino import ClearFolder, LoadGoldenDatabase, CompareWithGolden, GetBuildName, columns_to_import
+from DBASE_009_History import ComparisonHistory
+
+
+def GetFileState(file_name):
+    """ This function returns size and modification time of the file.
+
+    Arguments:
+        file_name: [str] Path of the file
+    Returns:
+        file_state: [tuple] Size and modification time of the file or None when file doesn't exist
+    """
+    try:
+        file_stat = os.stat(file_name)
+    except OSError:
+        return None
+    return file_stat.st_size, file_stat.st_mtime
+
+
+class FolderWatcher(object):
+    """ This class finds new or changed files matching the pattern. File is reported only when its size and
+    modification time are the same in two following scans, so files which are still being written are skipped.
+    """
+
+    def __init__(self, pattern, skip_existing_files=True):
+        """
+        Arguments:
+            pattern: [str] Glob pattern of the watched files
+            skip_existing_files: [bool] Files which already exist are not reported
+        """
+        self.pattern = pattern
+        self.pending_states = {}
+        self.reported_states = {}
+
+        if skip_existing_files:
+            for file_name in glob.glob(pattern):
+                self.reported_states[file_name] = GetFileState(file_name)
+
+    def GetReadyFiles(self):
+        """ This method scans the folder and returns files which are completely written since the last scan.
+
+        Returns:
+            ready_files: [list] Paths of the new or changed files (sorted by name)
+        """
+        ready_files = []
+        current_files = set(glob.glob(self.pattern))
+
+        for file_name in sorted(current_files):
+            file_state = GetFileState(file_name)
+            if file_state is None or file_state == self.reported_states.get(file_name):
+                self.pending_states.pop(file_name, None)
+                continue
+
+            if self.pending_states.get(file_name) == file_state and file_state[0] > 0:
+                ready_files.append(file_name)
+                self.reported_states[file_name] = file_state
+                del self.pending_states[file_name]
+            else:
+                # File is new or still being written, it is checked again in the next scan
+                self.pending_states[file_name] = file_state
+
+        # Forget removed files, so they are compared again when they are copied back
+        for file_name in list(self.reported_states):
+            if file_name not in current_files:
+                del self.reported_states[file_name]
+
+        return ready_files
+
+
+def WatchFolder(golden_file_name, pattern, output_folder, by_key=False, interval=0.2, skip_existing_files=True,
+                golden_cache_folder=None, history_file_name=None):
+    """ This function keeps golden parameter database in memory and compares every new target parameter database as
+    soon as it is completely written. Results of every build are saved in separate folder. Function runs until it is
+    interrupted with Ctrl+C.
+
+    Arguments:
+        golden_file_name: [str] Path of the golden parameter database
+        pattern: [str] Glob pattern of the target parameter databases
+        output_folder: [str] Path to the folder in which results are saved
+        by_key: [bool] Align parameters on Port Number and Parameter Number instead of row position
+        interval: [float] Time between two scans of the folder in seconds
+        skip_existing_files: [bool] Files which exist when watching starts are not compared
+        golden_cache_folder: [str] Path to the folder with cached parameter databases and fingerprints or None
+        history_file_name: [str] Path of the database in which differences of every build are stored or None
+    """
+    golden = LoadGoldenDatabase(golden_file_name, columns_to_import, golden_cache_folder)
+    history = ComparisonHistory(history_file_name) if history_file_name is not None else None
+    watcher = FolderWatcher(pattern, skip_existing_files)
+    print "Watching {} (Ctrl+C to stop)".format(pattern)
+
+    try:
+        while True:
+            for file_name in watcher.GetReadyFiles():
+                build_output_folder = os.path.join(output_folder, GetBuildName(file_name))
+                ClearFolder(build_output_folder)
+
+                build_record = None
+                if history is not None:
+                    build_record = history.StartBuild(GetBuildName(file_name), file_name, golden_file_name, by_key)
+
+                start_time = time.time()
+                try:
+                    differences_count, removed_count, added_count = CompareWithGolden(
+                        golden, file_name, columns_to_import, by_key, build_output_folder, golden_cache_folder,
+                        build_record)
+                except Exception as e:
+                    if build_record is not None:
+                        build_record.Rollback()
+                    print "Build {} not compared: {}".format(GetBuildName(file_name), str(e) or e.__class__.__name__)
+                    continue
+
+                status = 'Different' if differences_count or removed_count or added_count else 'Same'
+                print "Build {} compared in {:.3f} s: {} (results in {})".format(
+                    GetBuildName(file_name), time.time() - start_time, status, build_output_folder)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print "Watching stopped."
+    finally:
+        if history is not None:
+            history.Close()
+
+
+if __name__ == '__main__':
+    # Path of the original parameter database
+    rhino_file_name = 'Input\\Parameter_database_English.csv'
+    # Path of the folder in which parsed original parameter database and fingerprints are cached
+    golden_cache_folder = 'Input\\Cache'
+    # Path of the database in which differences of all compared builds are stored
+    history_file_name = 'History\\DBASE_009_History.sqlite'
+
+    parser = argparse.ArgumentParser(description='DBASE_009 - Database Parameter Test of every new emulation build '
+                                                 'saved in the watched folder')
+    parser.add_argument('folder', nargs='?', default='Input',
+                        help='Folder in which new Parameter_database_emulation_*.csv files are saved')
+    parser.add_argument('--by-key', action='store_true',
+                        help='Align parameters on Port Number and Parameter Number instead of row position')
+    parser.add_argument('--interval', type=float, default=0.2,
+                        help='Time between two scans of the folder in seconds')
+    parser.add_argument('--existing', action='store_true',
+                        help='Compare also target parameter databases which already exist in the folder')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Don\'t store differences in {}'.format(history_file_name))
+    arguments = parser.parse_args()
+
+    WatchFolder(rhino_file_name, os.path.join(arguments.folder, 'Parameter_database_emulation_*.csv'), 'Output',
+                arguments.by_key, arguments.interval, not arguments.existing, golden_cache_folder,
+                None if arguments.no_history else history_file_name)
@@ -1,175 +1,84 @@
-pf6000t = ["nan",
-           "CRx",
-           "Dev CR1",
-           "Dev CR1 R2",
-           "Dev CR2 R4",
-           "Temp CR3 R10"]
-
-pf755t_rev_1 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR1 R2",
-                "CR1 R3",
-                "CR2 R4",
-                "Dev CR2 R4",
-                "CR2 R5",
-                "CR2 R6",
-                "CR2 R6.003",
-                "CR2 R6.004",
-                "CR3",
-                "CR3 LC",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_2 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR1 R3",
-                "CR2 R4",
-                "Dev CR2 R4",
-                "CR2 R5",
-                "CR2 R6",
-                "CR2 R6.003",
-                "CR2 R6.004",
-                "CR3",
-                "CR3 LC",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_3 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR2 R4",
-                "Dev CR2 R4",
-                "CR2 R5",
-                "CR2 R6",
-                "CR2 R6.003",
-                "CR2 R6.004",
-                "CR3",
-                "CR3 LC",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_4 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR2 R5",
-                "CR2 R6",
-                "CR2 R6.003",
-                "CR2 R6.004",
-                "CR3",
-                "CR3 LC",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_5 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR2 R5",
-                "CR2 R6",
-                "CR2 R6.003",
-                "CR2 R6.004",
-                "CR3",
-                "CR3 LC",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_6_3 = ["nan",
-                  "CRx",
-                  "Dev CR1",
-                  "Dev CR1 R2",
-                  "Dev CR2 R4",
-                  "Temp CR3 R10",
-                  "CR2 R6.004",
-                  "CR3",
-                  "CR3 LC",
-                  "Temp CR3 R10",
-                  "CR3 R10",
-                  "CR3 R11",
-                  "MV_CR1",
-                  "MV_CR2"]
-
-pf755t_rev_6_4 = ["nan",
-                  "CRx",
-                  "Dev CR1",
-                  "Dev CR1 R2",
-                  "Dev CR2 R4",
-                  "Temp CR3 R10",
-                  "CR3",
-                  "CR3 LC",
-                  "Temp CR3 R10",
-                  "CR3 R10",
-                  "CR3 R11",
-                  "MV_CR1",
-                  "MV_CR2"]
-
-pf755t_rev_7 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_8 = ["nan",
-                "CRx",
-                "Dev CR1",
-                "Dev CR1 R2",
-                "Dev CR2 R4",
-                "Temp CR3 R10",
-                "CR3 R10",
-                "CR3 R11",
-                "MV_CR1",
-                "MV_CR2"]
-
-pf755t_rev_10 = ["nan",
-                 "CRx",
-                 "Dev CR1",
-                 "Dev CR1 R2",
-                 "Dev CR2 R4",
-                 "Temp CR3 R10",
-                 "CR3 R11",
-                 "MV_CR1",
-                 "MV_CR2"]
-
-pf755t_rev_11 = ["nan",
-                 "CRx",
-                 "Dev CR1",
-                 "Dev CR1 R2",
-                 "Dev CR2 R4",
-                 "Temp CR3 R10",
-                 "MV_CR1",
-                 "MV_CR2"]
+import bisect
+
+
+# CRs which are not applicable to any drive and firmware revision
+always_skipped_crs = frozenset(["nan",
+                                "CRx",
+                                "Dev CR1",
+                                "Dev CR1 R2",
+                                "Dev CR2 R4",
+                                "Temp CR3 R10"])
+
+# Commercial Releases of every drive family:
+#   introduced      - CRs in order of release with firmware revision (major, minor) in which they became applicable,
+#                     CR is skipped for all older revisions
+#   not_applicable  - CRs which are skipped for all revisions of the family
+# CRs not listed in the family are applicable to all revisions.
+drive_families = {
+    "PF6000T": {"introduced": [],
+                "not_applicable": []},
+
+    "PF755T": {"introduced": [("CR1", (1, 0)),
+                              ("CR1 R2", (2, 0)),
+                              ("CR1 R3", (3, 0)),
+                              ("CR2 R4", (4, 0)),
+                              ("CR2 R5", (6, 3)),
+                              ("CR2 R6", (6, 3)),
+                              ("CR2 R6.003", (6, 3)),
+                              ("CR2 R6.004", (6, 4)),
+                              ("CR3", (7, 0)),
+                              ("CR3 LC", (7, 0)),
+                              ("CR3 R10", (10, 0)),
+                              ("CR3 R11", (11, 0))],
+               "not_applicable": ["MV_CR1",
+                                  "MV_CR2"]},
+}
+
+
+def GenerateSkipSets(family_text):
+
+    """ This function is designed to generate sets of CRs to skip for every firmware revision of the drive family at
+    once. Skip set changes only at revisions in which some CR was introduced, so the set of a revision is valid up to
+    the next listed revision.
+    :param family_text: [str] Drive family, e.g. "PF755T"
+    :return: list[tuple] (revision, frozenset of CRs to skip) sorted by revision, the first revision is (0, 0)
+    """
+
+    if family_text not in drive_families:
+        raise ValueError('Unknown drive family "{}", known families: {}'.format(
+            family_text, ', '.join(sorted(drive_families))))
+
+    family = drive_families[family_text]
+    introduced = family["introduced"]
+    base_skip_set = always_skipped_crs.union(family["not_applicable"])
+
+    revisions = sorted(set([(0, 0)] + [revision for _, revision in introduced]))
+    return [(revision, frozenset(base_skip_set.union(cr for cr, introduced_revision in introduced
+                                                     if revision < introduced_revision)))
+            for revision in revisions]
+
+
+# Skip sets of all families precomputed once, key = family and value = (sorted revisions, skip sets)
+skip_sets_by_family = {}
+for _family_text in drive_families:
+    _skip_sets = GenerateSkipSets(_family_text)
+    skip_sets_by_family[_family_text] = ([revision for revision, _ in _skip_sets],
+                                         [skip_set for _, skip_set in _skip_sets])
+
+
+def GetCrsToSkip(family_text, major_rev, minor_rev):
+
+    """ This function is designed to return CRs which are not applicable to the drive with given firmware revision.
+    Any revision is supported, e.g. 6.5 uses the skip set of 6.4 and 9 the skip set of 8 (introduced in 7).
+    :param family_text: [str] Drive family, e.g. "PF755T"
+    :param major_rev: [int] Major firmware revision
+    :param minor_rev: [int] Minor firmware revision
+    :return: [frozenset] CRs to skip
+    """
+
+    if family_text not in skip_sets_by_family:
+        raise ValueError('Unknown drive family "{}", known families: {}'.format(
+            family_text, ', '.join(sorted(drive_families))))
+
+    revisions, skip_sets = skip_sets_by_family[family_text]
+    return skip_sets[bisect.bisect_right(revisions, (major_rev, minor_rev)) - 1]
@@ -0,0 +1,119 @@
+import json
+import os
+
+
+# Python types of the DHCF values based on "@ValueType" attribute
+dhcf_value_types = {'bool_t': bool,
+                    'int8_t': int,
+                    'int16_t': int,
+                    'int32_t': int,
+                    'uint8_t': int,
+                    'uint16_t': int,
+                    'uint32_t': int,
+                    'float32_t': float,
+                    'float64_t': float}
+
+# Parsed DHCF files cached in the process, key = absolute path and value = (modification time, configuration)
+dhcf_configurations_cache = {}
+
+
+class DhcfConfiguration(object):
+    """ This class stores drive configuration read from the DHCF json file. Values are converted to the Python type
+    given by "@ValueType" attribute (bool, int or float), e.g. configuration['Power System Configuration'] returns int.
+    """
+
+    def __init__(self, file_name, dhcf_json):
+
+        """ :param file_name: [str] Path of the DHCF json file
+        :param dhcf_json: [dict] Content of the DHCF json file
+        """
+
+        self.file_name = file_name
+        self.name = os.path.splitext(os.path.basename(file_name))[0]
+        self.values = {}
+        self.value_types = {}
+        self.texts = {}
+
+        for entry in dhcf_json['']:
+            key = str(entry['@Key'])
+            value_type = str(entry['@Attributes']['@ValueType'])
+            value = entry['@Attributes']['@Value']
+
+            if value_type not in dhcf_value_types:
+                raise ValueError('Unknown value type {} of DHCF key "{}" in {}'.format(value_type, key, file_name))
+
+            self.values[key] = dhcf_value_types[value_type](value)
+            self.value_types[key] = value_type
+            self.texts[key] = str(value)
+
+    def __getitem__(self, key):
+        try:
+            return self.values[key]
+        except KeyError:
+            raise KeyError('DHCF key "{}" not found in {}'.format(key, self.file_name))
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def Get(self, key, default=None):
+
+        """ This method returns typed value of the DHCF key or default value when the key doesn't exist.
+        :param key: [str] DHCF key, e.g. 'Drive Enclosure Type'
+        :param default: Value returned when key doesn't exist
+        :return: [bool/int/float] Value of the DHCF key
+        """
+
+        return self.values.get(key, default)
+
+    def Text(self, key):
+
+        """ This method returns value of the DHCF key as the text written in the json file (e.g. '0'). Values copied
+        from DHCF to the generated tables are written as text, like before the values were typed.
+        :param key: [str] DHCF key, e.g. 'Drive Enclosure Type'
+        :return: [str] Value of the DHCF key as text
+        """
+
+        try:
+            return self.texts[key]
+        except KeyError:
+            raise KeyError('DHCF key "{}" not found in {}'.format(key, self.file_name))
+
+    def Keys(self):
+
+        """ This method returns all DHCF keys of the configuration.
+        :return: list[str] DHCF keys
+        """
+
+        return list(self.values)
+
+
+def LoadDhcfConfiguration(file_name='dhcf.json'):
+
+    """ This function is designed to read DHCF json file only once per process. Parsed configuration is cached and
+    the file is read again only when its modification time changes.
+    :param file_name: [str] Path of the DHCF json file
+    :return: [DhcfConfiguration] Configuration of the drive
+    """
+
+    file_path = os.path.abspath(file_name)
+    modification_time = os.path.getmtime(file_path)
+
+    cached = dhcf_configurations_cache.get(file_path)
+    if cached is not None and cached[0] == modification_time:
+        return cached[1]
+
+    with open(file_path, 'r') as f:
+        configuration = DhcfConfiguration(file_name, json.load(f))
+
+    dhcf_configurations_cache[file_path] = (modification_time, configuration)
+    return configuration
+
+
+def LoadDhcfConfigurations(file_names):
+
+    """ This function is designed to read many DHCF json files (one per drive configuration).
+    :param file_names: list[str] Paths of the DHCF json files
+    :return: list[DhcfConfiguration] Configurations of the drives in the same order as file_names
+    """
+
+    return [LoadDhcfConfiguration(file_name) for file_name in file_names]
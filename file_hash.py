@@ -0,0 +1,16 @@
+import hashlib
+
+
+def GetFileHash(file_name):
+
+    """ This function is designed to calculate md5 hash of the file content. It is shared by pandas_training.py and the
+    scripts of Rhino Parameters Comparison, which use it to find out whether cached files are up to date.
+    :param file_name: [str] Path of the file
+    :return: [str] Hexadecimal md5 hash
+    """
+
+    file_hash = hashlib.md5()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
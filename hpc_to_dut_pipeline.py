@@ -0,0 +1,132 @@
+import pandas
+import argparse
+import os
+import sys
+
+import pandas_training
+from dhcf_configuration import LoadDhcfConfiguration
+from stage_profiler import profiler
+
+# DBASE_009 comparison is located in the Rhino Parameters Comparison folder of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Rhino Parameters Comparison'))
+from DBASE_009_Rhino import ClearFolder, CreateGoldenDatabase, CompareWithGolden
+
+
+@profiler.Profiled('MapToParameterDatabase')
+def MapToParameterDatabase(dataframe, ports):
+
+    """ This function is designed to convert generated table of HPC Database to the columns of the parameter database
+    read from the drive (DUT). The same table is repeated for every port of the sheet.
+    :param dataframe: [dataframe] Pandas input object returned by DataframeModifications
+    :param ports: list[int] Port numbers of the sheet
+    :return: [dataframe] Pandas output object with parameter database columns
+    """
+
+    parameters_dataframes = []
+    for port in ports:
+        parameters_dataframe = pandas.DataFrame({'Port Number': port}, index=dataframe.index,
+                                                columns=['Port Number'])
+        for hpc_column_name, parameter_column_name in parameter_database_columns:
+            parameters_dataframe[parameter_column_name] = dataframe[hpc_column_name].values
+        parameters_dataframes.append(parameters_dataframe)
+
+    return pandas.concat(parameters_dataframes, ignore_index=True)
+
+
+def GenerateExpectedParameters(excel_file_name, dhcf, cache_folder=None):
+
+    """ This function is designed to generate expected parameter database of the tested drive (EDIT SECTION of
+    pandas_training.py) directly from HPC Database, without saving the tables to excel files.
+    :param excel_file_name: [str] Path of HPC Database
+    :param dhcf: [DhcfConfiguration] Configuration of the drive
+    :param cache_folder: [str] Path to the folder with parsed sheets (None = cache isn't used)
+    :return: [dataframe] Expected parameter database
+    """
+
+    sheet_names = [sheet_name for sheet_name in pandas_training.sheets_to_parse if sheet_name in sheets_ports]
+    cache_file_names = pandas_training.GetSheetsCacheFileNames(excel_file_name, sheet_names,
+                                                               pandas_training.columns_to_import, cache_folder)
+    sheets_dataframes = pandas_training.ReadSheets(excel_file_name, sheet_names, pandas_training.columns_to_import,
+                                                   cache_file_names)
+
+    parameters_dataframes = []
+    for sheet_name, dataframe in zip(sheet_names, sheets_dataframes):
+        dataframe = pandas_training.DataframeModifications(dataframe, sheet_name, dhcf)
+        parameters_dataframes.append(MapToParameterDatabase(dataframe, sheets_ports[sheet_name]))
+
+    return pandas.concat(parameters_dataframes, ignore_index=True)
+
+
+def CompareExpectedWithDut(expected_dataframe, dut_file_name, output_folder='Output'):
+
+    """ This function is designed to compare expected parameter database with the one read from the drive (DUT).
+    Parameters are matched by Port Number and Parameter Number and the report is saved by DBASE_009 comparison.
+    :param expected_dataframe: [dataframe] Expected parameter database returned by GenerateExpectedParameters
+    :param dut_file_name: [str] Path of the parameter database read from the drive (csv file)
+    :param output_folder: [str] Path to the folder in which report is saved
+    :return: [tuple] Number of differences in every column, number of expected parameters missing in DUT and number
+    of DUT parameters which aren't expected
+    """
+
+    compared_columns = ['Port Number'] + [column_name for _, column_name in parameter_database_columns]
+    golden = CreateGoldenDatabase(expected_dataframe, compared_columns)
+    return CompareWithGolden(golden, dut_file_name, compared_columns, by_key=True, output_folder=output_folder)
+
+
+'''**************************************************'''
+'''MAINTENANCE SECTION - this variables need to be   '''
+'''maintained when changes in HPC Database Draft     '''
+'''will appear.                                      '''
+
+# Ports of the parameters of every sheet of HPC Database
+sheets_ports = {"Port 0 ICB Parameters": [0],
+                "Port 9 Application Parameters": [9],
+                "Ports 10 & 11 Invrtr Ctrl Param": [10, 11],
+                "Port 13 Converter Control Param": [13],
+                "Port 12 PCCB Parameters": [12],
+                "Port 14 PIOB Parameters": [14]}
+
+# Columns of HPC Database and matching columns of the parameter database read from the drive
+parameter_database_columns = [("New Parameter Number", 'Parameter Number'),
+                              ("Name", 'Parameter Name'),
+                              ("Online Maximum", 'Parameter Max Value'),
+                              ("Online Minimum", 'Parameter Min Value'),
+                              ("Online Default", 'Parameter Default Value')]
+'''**************************************************'''
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Comparison of the parameters generated from HPC Database with the '
+                                                 'parameter database read from the drive')
+    parser.add_argument('dut', help='Parameter database read from the drive (csv file)')
+    parser.add_argument('--dhcf', default=pandas_training.dhcf_file_names[0],
+                        help='DHCF file of the drive configuration')
+    parser.add_argument('--output', default='Output',
+                        help='Folder in which Results.txt and Differences.xlsx are saved')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse all sheets from the workbook instead of reading them from {} folder'.format(
+                            pandas_training.sheets_cache_folder))
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure time, rows and memory of every stage and save summary in Profile.json')
+    arguments = parser.parse_args()
+
+    if arguments.profile:
+        profiler.Enable()
+
+    # Remove all files from output folder
+    ClearFolder(arguments.output)
+
+    expected_parameters = GenerateExpectedParameters(
+        pandas_training.file_name, LoadDhcfConfiguration(arguments.dhcf),
+        None if arguments.no_cache else pandas_training.sheets_cache_folder)
+    print "{} parameters expected for {}".format(len(expected_parameters), pandas_training.default_variant['name'])
+
+    differences_count, missing_count, unexpected_count = CompareExpectedWithDut(expected_parameters, arguments.dut,
+                                                                                arguments.output)
+    print "Parameters missing in DUT: {}".format(missing_count)
+    print "Parameters not expected: {}".format(unexpected_count)
+    for column_name, count in sorted(differences_count.items()):
+        print "{:<25} {} differences".format(column_name, count)
+
+    if arguments.profile:
+        profiler.SaveSummary(os.path.join(arguments.output, 'Profile.json'))
+        print "File Profile.json saved successfully!"
@@ -0,0 +1,131 @@
+# Overrides of Online Minimum, Maximum and Default values of the Port 0 ICB Parameters which depend on the drive
+# rating or DHCF configuration. Rules are applied in the listed order, so a later rule overwrites an earlier one.
+#
+#   names       - names of the parameters
+#   cr          - Commercial Release of the parameters (None = any)
+#   column      - overwritten column
+#   formula     - python expression of the value, it can use Rated_Volts, Rated_Current, Rated_Amps, Motor_Poles,
+#                 Rated_kW, sqrt, dhcf (configuration read from DHCF file, e.g. dhcf['PreCharge Option']) and
+#                 applicable_to (name of the "Applicable to" column of the tested drive). Values copied from DHCF file
+#                 use dhcf.Text(key), so they are written to the table as text like in the json file
+#   condition   - optional python expression (same names as formula), rule is applied only if it is true
+
+online_override_rules = [
+    {'names': ['DC Bus Volts'],
+     'cr': 'CR1',
+     'column': 'Online Maximum',
+     'formula': "Rated_Volts*1.35*sqrt(2)"},
+
+    {'names': ['DC Bus Volts'],
+     'cr': 'MV_CR1',
+     'column': 'Online Maximum',
+     'formula': "Rated_Volts*2*sqrt(2)"},
+
+    # TODO: For other drives this needs to be verified (in HPC Database - port 10 parameter 10)
+    {'names': ['Average Power'],
+     'cr': 'CR1',
+     'column': 'Online Maximum',
+     'formula': "Rated_kW*2",
+     'condition': "applicable_to in ['Applicable to Integrated AFE Drives (PF755TR)?', "
+                  "'Applicable to Low Harmonic Drives (PF755TL)?', "
+                  "'Applicable to AFE Bus Supplies (PF755TM)?', "
+                  "'Applicable to Frame 5-6 Panel Mount Drives (PF755TR and PF755TL)?', "
+                  "'Applicable to Frame 6 Panel Mount Bus Supplies (PF755TM)?']"},
+
+    {'names': ['L Gnd Warn Lvl'],
+     'cr': 'CR1',
+     'column': 'Online Maximum',
+     'formula': "0.25*Rated_Amps"},
+
+    # TODO: This needs to be verified with CR version like above or/and with applicable drive name
+    {'names': ['Average Power'],
+     'cr': 'MV_CR1',
+     'column': 'Online Maximum',
+     'formula': "2*sqrt(3)*Rated_Volts*Rated_Amps/1000"},
+
+    {'names': ['Real Power', 'Reactive Power', 'Avg Reactive Pwr', 'Apparent Power', 'Avg Apparent Pwr',
+               'Projctd kWDmnd', 'Projctd kVARDmnd', 'Projctd kVADmnd'],
+     'cr': None,
+     'column': 'Online Maximum',
+     'formula': "2*sqrt(3)*Rated_Volts*Rated_Amps/1000"},
+
+    {'names': ['Emb Enet Ref', 'Port 1 Reference', 'Port 2 Reference', 'Port 3 Reference', 'Port 4 Reference',
+               'Port 5 Reference', 'Port 6 Reference', 'Purge Frequency', 'Emb Logic Ref'],
+     'cr': None,
+     'column': 'Online Maximum',
+     'formula': "120*120/Motor_Poles"},
+
+    {'names': ['Emb Enet Ref', 'Port 1 Reference', 'Port 2 Reference', 'Port 3 Reference', 'Port 4 Reference',
+               'Port 5 Reference', 'Port 6 Reference', 'Purge Frequency', 'Emb Logic Ref'],
+     'cr': None,
+     'column': 'Online Minimum',
+     'formula': "-120*120/Motor_Poles"},
+
+    {'names': ['Enclosure Type'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "dhcf.Text('Drive Enclosure Type')"},
+
+    {'names': ['Duty Rating Act'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "dhcf.Text('Drive OverLoad Rating')"},
+
+    {'names': ['Purge Frequency'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "30*120/Motor_Poles"},
+
+    {'names': ['Drive Power Cfg'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "dhcf.Text('Power System Configuration')"},
+
+    {'names': ['Drive Frame'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "dhcf.Text('Drive Frame Size')"},
+
+    {'names': ['Prchrg Option'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "dhcf.Text('PreCharge Option')"},
+
+    # (Hybrid)
+    {'names': ['Main/Inp DvcType'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "3"},
+
+    # (NotInstalled)
+    {'names': ['Output Dvc Type'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "0",
+     'condition': "dhcf['Power System Configuration'] == 0"},
+
+    # (1-Coil)
+    {'names': ['Output Dvc Type'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "1",
+     'condition': "dhcf['Power System Configuration'] in [1, 4, 5]"},
+
+    # (1-Coil) or (NotInstalled)
+    {'names': ['Bypass Dvc Type'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "1 if dhcf['Power System Configuration'] in [4, 5] else 0"},
+
+    # (2-Coil) or (NotInstalled)
+    {'names': ['Prchrg Dvc Type'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "2 if dhcf['PreCharge Option'] != 0 else 0"},
+
+    # (DrvRunning)
+    {'names': ['Output Dvc Cfg'],
+     'cr': None,
+     'column': 'Online Default',
+     'formula': "0"},
+]
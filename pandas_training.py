@@ -1,7 +1,99 @@
 import pandas
-import json
+import numpy
+import argparse
+import hashlib
+import multiprocessing
+import os
+import re
+import time
 import crs_to_skip_definitions
 from math import sqrt
+from dhcf_configuration import LoadDhcfConfiguration, LoadDhcfConfigurations
+from file_hash import GetFileHash
+from online_override_rules import online_override_rules
+from stage_profiler import profiler
+from table_export import TableExporter, export_formats
+
+try:
+    import openpyxl
+    from pandas.io.parsers import TextParser
+except ImportError:
+    # Without openpyxl every sheet is parsed with xlrd which always reads the whole workbook
+    openpyxl = None
+
+
+class FilterPipeline(object):
+    """ This class collects conditions of the rows to skip and applies all of them at once. Every condition is
+    evaluated as a boolean mask on the input dataframe, masks are combined and the dataframe is copied only once
+    in Materialize method.
+    """
+
+    blank_cells = ['', 'nan', 'NaN']
+
+    def __init__(self, dataframe):
+
+        """ :param dataframe: [dataframe] Pandas input object (it isn't modified)
+        """
+
+        self.dataframe = dataframe
+        self.skip_conditions = []
+
+    def SkipValuesLikeList(self, column_name, values_to_skip):
+
+        """ This method adds condition which skips rows with "values_to_skip" in "column_name" column. If values
+        contain blank cell ('', 'nan' or 'NaN'), rows with empty cell are skipped too.
+        :param column_name: [str] Name of column with values to filter
+        :param values_to_skip: list[str] Values to be skipped
+        :return: [FilterPipeline] The same pipeline, so conditions can be chained
+        """
+
+        skip_blank_cells = any(item in values_to_skip for item in self.blank_cells)
+
+        def SkipMask(dataframe):
+            column = dataframe[column_name]
+            mask = column.isin(values_to_skip).values
+            if skip_blank_cells:
+                mask |= column.isnull().values
+            return mask
+
+        self.skip_conditions.append(SkipMask)
+        return self
+
+    def SkipValuesLikeRegEx(self, column_name, like):
+
+        """ This method adds condition which skips rows with values matching regular expression in "column_name"
+        column. Cells which aren't text are not skipped.
+        :param column_name: [str] Name of column with values to remove
+        :param like: [str or compiled regular expression] Value on which column will be removed
+        :return: [FilterPipeline] The same pipeline, so conditions can be chained
+        """
+
+        pattern = re.compile(like) if isinstance(like, basestring) else like
+
+        def SkipMask(dataframe):
+            column = dataframe[column_name]
+            if column.dtype != object:
+                return numpy.zeros(len(column), dtype=bool)
+            return column.str.contains(pattern, regex=True, na=False).values
+
+        self.skip_conditions.append(SkipMask)
+        return self
+
+    def Materialize(self):
+
+        """ This method applies all conditions to the input dataframe.
+        :return: [dataframe] Filtered pandas output object (a copy of the input dataframe)
+        """
+
+        with profiler.Stage('FilterPipeline', len(self.dataframe)) as stage_record:
+            skip_mask = numpy.zeros(len(self.dataframe), dtype=bool)
+            for SkipMask in self.skip_conditions:
+                skip_mask |= SkipMask(self.dataframe)
+
+            dataframe = self.dataframe[~skip_mask]
+            stage_record['rows_out'] = len(dataframe)
+
+        return dataframe
 
 
 def SkipValuesLikeList(dataframe, column_name, values_to_skip):
@@ -14,18 +106,7 @@ def SkipValuesLikeList(dataframe, column_name, values_to_skip):
     :return: [dataframe] Filtered pandas output object
     """
 
-    blank_cells = ['', 'nan', 'NaN']
-
-    # Retrieve all parameters indexes from dataframe with value_to_skip in column_name
-    filtered_data_indexes = dataframe.index[dataframe[column_name].isin(values_to_skip)]
-    # Return filtered data in dataframe
-    dataframe = dataframe.drop(filtered_data_indexes)
-
-    if any(item in values_to_skip for item in blank_cells):
-        # Remove rows with blank cell in column_to_filter columns
-        dataframe.dropna(subset=[column_name], inplace=True)
-
-    return dataframe
+    return FilterPipeline(dataframe).SkipValuesLikeList(column_name, values_to_skip).Materialize()
 
 
 def SkipValuesLikeRegEx(dataframe, column_name, like):
@@ -33,18 +114,14 @@ def SkipValuesLikeRegEx(dataframe, column_name, like):
     """ This function is designed to remove unwanted rows from dataframe regarding value in the specified column.
     :param dataframe: [dataframe] Pandas input object
     :param column_name: [str] Name of column with values to remove
-    :param like: [str] Value on which column will be removed
+    :param like: [str or compiled regular expression] Value on which column will be removed
     :return: [dataframe] Filtered pandas output object
     """
 
-    # Retrieve all parameters indexes from dataframe with value_to_skip in column_name
-    filtered_data_indexes = dataframe.index[dataframe[column_name].str.contains(like, regex=True, na=False)]
-    # Return filtered data in dataframe
-    dataframe = dataframe.drop(filtered_data_indexes)
-
-    return dataframe
+    return FilterPipeline(dataframe).SkipValuesLikeRegEx(column_name, like).Materialize()
 
 
+@profiler.Profiled('DeleteDuplicatedParams')
 def DeleteDuplicatedParams(dataframe, priorities_dictionary):
 
     """ This function is designed to delete duplications from dataframe. If dataframe contains the same parameter
@@ -55,43 +132,137 @@ def DeleteDuplicatedParams(dataframe, priorities_dictionary):
     :return: [dataframe] Pandas output object without duplications
     """
 
-    # Filling "crs_priorities_list" with values based on CR name from Commercial Release column and
-    # value from "priorities_dictionary" assigned to certain CR name
-    crs_priorities_list = []
-    for i in range(len(dataframe)):
-        crs_priorities_list.append(priorities_dictionary[dataframe['Commercial Release'].values[i]])
-
-    # Adding CR priority column with assigned values
-    dataframe['CR priority'] = crs_priorities_list
-    # Sorting dataframe by the values from CR priority column (from lowest priority [highest value]
-    # to the highest [lowest value]
-    dataframe = dataframe.sort_values("CR priority", ascending=False)
-    # Checking for duplicates in Name column. If exist then leave only last (highest priority).
-    dataframe = dataframe.drop_duplicates(subset="Name", keep="last")
-    # Sorting dataframe by New Parameter Number column. Return to the previous sort (from lowest to highest).
-    dataframe = dataframe.sort_values("New Parameter Number")
-    # Delete CR priority column added for duplications deletion purpose
-    dataframe.drop('CR priority', inplace=True, axis=1)
+    # Commercial Release as ordered categorical - from the highest priority (the lowest value) to the lowest one
+    crs_categories = sorted(priorities_dictionary, key=priorities_dictionary.get)
+    crs_categorical = pandas.Categorical(dataframe['Commercial Release'], categories=crs_categories, ordered=True)
+
+    # CRs which aren't in priorities_dictionary get code -1
+    unknown_crs = dataframe['Commercial Release'].values[crs_categorical.codes == -1]
+    if len(unknown_crs):
+        raise ValueError('Commercial Release without priority: {}'.format(
+            ', '.join(sorted(set(str(cr) for cr in unknown_crs)))))
+
+    # Parameters without name are deduplicated together like by drop_duplicates
+    name_codes = pandas.factorize(dataframe['Name'].fillna('').values)[0]
+
+    # Rows sorted by name, CR priority and position from the last row, so the last row wins when priorities are equal
+    # (like drop_duplicates with keep="last"). For every parameter name leave only the first row - the one with the
+    # highest priority CR.
+    reversed_positions = numpy.arange(len(name_codes))[::-1]
+    sorted_rows = numpy.lexsort((reversed_positions, crs_categorical.codes, name_codes))
+    sorted_name_codes = name_codes[sorted_rows]
+    first_of_name = numpy.ones(len(sorted_rows), dtype=bool)
+    first_of_name[1:] = sorted_name_codes[1:] != sorted_name_codes[:-1]
+
+    # Keep sort by New Parameter Number (from lowest to highest)
+    dataframe = dataframe.iloc[sorted_rows[first_of_name]].sort_values("New Parameter Number", kind='mergesort')
 
     return dataframe
 
 
-def DataframeModifications(dataframe, sheet_name):
-    # Example of regex and removing unwanted rows
-    if sheet_name == "Port 12 PCCB Parameters":
-        dataframe = SkipValuesLikeRegEx(dataframe, 'Name', 'U1|W1|V1|U2|W2|V2|U3|W3|V3|U4|W4|V4|U5|W5|V5|U6|W6|V6|U7|'
-                                                           'W7|V7|U8|W8|V8|U9|W9|V9')
-    if sheet_name == "Port 14 PIOB Parameters":
-        dataframe = SkipValuesLikeRegEx(dataframe, 'New Parameter Number', 'TBD')
+def CompileOverrideRules(rules):
+
+    """ This function is designed to compile formulas and conditions of the override rules only once.
+    :param rules: list[dict] Override rules (see online_override_rules.py)
+    :return: list[dict] Rules with compiled "formula" and "condition" code objects
+    """
+
+    compiled_rules = []
+    for rule in rules:
+        condition = rule.get('condition')
+        compiled_rules.append({'names': list(rule['names']),
+                               'cr': rule.get('cr'),
+                               'column': rule['column'],
+                               'formula': compile(rule['formula'], rule['formula'], 'eval'),
+                               'condition': None if condition is None else compile(condition, condition, 'eval')})
+    return compiled_rules
+
+
+@profiler.Profiled('SetOnlineValues')
+def SetOnlineValues(dataframe, dhcf, compiled_rules=None, applicable_to=None, rating=None):
+
+    """ This function is designed to set Online Minimum, Maximum and Default values of the ICB parameters which depend
+    on the drive rating or DHCF configuration. Every rule is applied to all matching rows at once.
+    :param dataframe: [dataframe] Pandas input object (Port 0 ICB Parameters)
+    :param dhcf: [DhcfConfiguration] Configuration of the drive read from DHCF file
+    :param compiled_rules: list[dict] Rules returned by CompileOverrideRules (compiled online_override_rules if None)
+    :param applicable_to: [str] Name of the "Applicable to" column of the tested drive (applicable_to_column_name
+    if None)
+    :param rating: [dict] Rating of the drive used in the formulas (default_rating if None)
+    :return: [dataframe] Pandas output object with calculated Online values
+    """
+
+    if compiled_rules is None:
+        compiled_rules = compiled_online_override_rules
+    if applicable_to is None:
+        applicable_to = applicable_to_column_name
+    if rating is None:
+        rating = default_rating
+
+    eval_dict = dict(rating)
+    eval_dict.update({'sqrt': sqrt,
+                      'dhcf': dhcf,
+                      'applicable_to': applicable_to})
+
+    names = dataframe['Name']
+    crs = dataframe['Commercial Release'].values
 
-    # Skip parameters with CRs which are not applicable to the drive
-    dataframe = SkipValuesLikeList(dataframe, 'Commercial Release', crs_to_skip)
+    for rule in compiled_rules:
+        if rule['condition'] is not None and not eval(rule['condition'], eval_dict):
+            continue
 
-    # Skip parameters with Applicable to column values like No and empty cell
-    dataframe = SkipValuesLikeList(dataframe, applicable_to_column_name, applicable_values_to_skip)
+        mask = names.isin(rule['names']).values
+        if rule['cr'] is not None:
+            mask &= crs == rule['cr']
+        if not mask.any():
+            continue
+
+        # Value is written like to the single cell (converted to the datatype of the column)
+        dataframe[rule['column']].values[mask] = eval(rule['formula'], eval_dict)
+
+    return dataframe
+
+
+@profiler.Profiled('BaseModifications')
+def BaseModifications(dataframe, sheet_name):
+
+    """ This function is designed to remove rows which are skipped for every tested drive and firmware revision.
+    :param dataframe: [dataframe] Pandas input object (parsed sheet)
+    :param sheet_name: [str] Name of the sheet
+    :return: [dataframe] Filtered pandas output object
+    """
+
+    filter_pipeline = FilterPipeline(dataframe)
+
+    # Example of regex and removing unwanted rows
+    for column_name, pattern in sheets_regex_skips.get(sheet_name, []):
+        filter_pipeline.SkipValuesLikeRegEx(column_name, pattern)
 
     # Skip parameters which are named as "Reserved"
-    dataframe = SkipValuesLikeList(dataframe, 'Name', names_to_skip)
+    filter_pipeline.SkipValuesLikeList('Name', names_to_skip)
+
+    return filter_pipeline.Materialize()
+
+
+@profiler.Profiled('VariantModifications')
+def VariantModifications(dataframe, sheet_name, variant, dhcf=None, online_values=True):
+
+    """ This function is designed to filter and modify the sheet for one tested drive, firmware revision and
+    applicability column. Input dataframe isn't modified, so it can be shared by many variants.
+    :param dataframe: [dataframe] Pandas input object returned by BaseModifications
+    :param sheet_name: [str] Name of the sheet
+    :param variant: [dict] Variant returned by GetVariant
+    :param dhcf: [DhcfConfiguration] Configuration of the drive (the first file of dhcf_file_names if None)
+    :param online_values: [bool] Calculate Online values of Port 0 ICB Parameters (False = values of HPC Database)
+    :return: [dataframe] Pandas output object
+    """
+
+    # Skip parameters with CRs which are not applicable to the drive and with Applicable to column values like No and
+    # empty cell
+    dataframe = FilterPipeline(dataframe) \
+        .SkipValuesLikeList('Commercial Release', variant['crs_to_skip']) \
+        .SkipValuesLikeList(variant['applicable_to_column_name'], applicable_values_to_skip) \
+        .Materialize()
 
     # Delete duplicated parameters based on the priority of CR and overwrite dataframe
     dataframe = DeleteDuplicatedParams(dataframe, crs_priorities_dict)
@@ -99,147 +270,314 @@ def DataframeModifications(dataframe, sheet_name):
     # Change displayed "New Parameter Number" value datatype from real to int
     dataframe['New Parameter Number'] = dataframe['New Parameter Number'].astype(int)
 
-    with open('dhcf.json', 'r') as f:
-        dhcf_json = json.load(f)
+    if sheet_name == "Port 0 ICB Parameters" and online_values:
+        if dhcf is None:
+            dhcf = LoadDhcfConfiguration(dhcf_file_names[0])
+        dataframe = SetOnlineValues(dataframe, dhcf, applicable_to=variant['applicable_to_column_name'])
 
-    dhcf_keys = []
-    dhcf_values = []
-    for i in range(len(dhcf_json[''])):
-        dhcf_keys.append(dhcf_json[''][i]['@Key'])
-        dhcf_values.append(dhcf_json[''][i]['@Attributes']['@Value'])
+    return dataframe
 
-    dhcf_keys = map(str, dhcf_keys)
-    dhcf_values = map(str, dhcf_values)
-    dhcf_file = dict(zip(dhcf_keys, dhcf_values))
 
-    # Parameters to read for calculations
-    rated_volts = 480
-    rated_current = 20
-    rated_amps = 20
-    motor_poles = 4
-    rated_kw = 0.86
+@profiler.Profiled('DataframeModifications')
+def DataframeModifications(dataframe, sheet_name, dhcf=None, variant=None):
 
-    if sheet_name == "Port 0 ICB Parameters":
+    """ This function is designed to modify parsed sheet for one variant (tested drive from EDIT SECTION if None).
+    :param dataframe: [dataframe] Pandas input object (parsed sheet)
+    :param sheet_name: [str] Name of the sheet
+    :param dhcf: [DhcfConfiguration] Configuration of the drive (the first file of dhcf_file_names if None)
+    :param variant: [dict] Variant returned by GetVariant
+    :return: [dataframe] Pandas output object
+    """
 
-        eval_dict = {'Rated_Volts': rated_volts,
-                     'Rated_Current': rated_current,
-                     'Rated_Amps': rated_amps,
-                     'Motor_Poles': motor_poles,
-                     'Rated_kW': rated_kw,
-                     'sqrt': sqrt}
+    if variant is None:
+        variant = default_variant
 
-        for idx, name in enumerate(dataframe['Name'].values):
+    return VariantModifications(BaseModifications(dataframe, sheet_name), sheet_name, variant, dhcf)
 
-            cr = dataframe['Commercial Release'].values[idx]
 
-            if name in ['DC Bus Volts'] and cr == 'CR1':
-                dataframe['Online Maximum'].values[idx] = eval("Rated_Volts*1.35*sqrt(2)", eval_dict)
+def GetVariant(family_text, major_rev, minor_rev, applicable_to, output_folder=None):
 
-            if name in ['DC Bus Volts'] and cr == 'MV_CR1':
-                dataframe['Online Maximum'].values[idx] = eval("Rated_Volts*2*sqrt(2)", eval_dict)
+    """ This function is designed to describe one generated variant - tested drive, firmware revision and column
+    with applicability of the parameters.
+    :param family_text: [str] Drive family, e.g. "PF755T"
+    :param major_rev: [int] Major firmware revision
+    :param minor_rev: [int] Minor firmware revision
+    :param applicable_to: [str] Name of the "Applicable to" column
+    :param output_folder: [str] Folder of the output files (matrix_output_folder\<variant name> if None)
+    :return: [dict] Variant with its name, CRs to skip and output folder
+    """
 
-            if name in ['Average Power'] and cr == 'CR1':
-                if applicable_to_column_name in ["Applicable to Integrated AFE Drives (PF755TR)?",
-                                                 "Applicable to Low Harmonic Drives (PF755TL)?",
-                                                 "Applicable to AFE Bus Supplies (PF755TM)?",
-                                                 "Applicable to Frame 5-6 Panel Mount Drives (PF755TR and PF755TL)?",
-                                                 "Applicable to Frame 6 Panel Mount Bus Supplies (PF755TM)?"]:
-                    dataframe['Online Maximum'].values[idx] = eval("Rated_kW*2", eval_dict)
-                else:
-                    pass  #TODO: This needs to be verified (in HPC Database - port 10 parameter 10)
+    # Applicability column shortened and without characters which can't be used in the folder name
+    applicability = re.sub(r'[\\/:*?"<>|]', '', applicable_to.replace('Applicable to ', ''))
+    name = "{} {}.{} - {}".format(family_text, major_rev, minor_rev, applicability)
 
-            if name in ['L Gnd Warn Lvl'] and cr == 'CR1':
-                dataframe['Online Maximum'].values[idx] = eval("0.25*Rated_Amps", eval_dict)
+    return {'name': name,
+            'tested_drive': family_text,
+            'major_fw_rev': major_rev,
+            'minor_fw_rev': minor_rev,
+            'applicable_to_column_name': applicable_to,
+            'crs_to_skip': FilterByFirmwareRev(major_rev, minor_rev, family_text),
+            'output_folder': os.path.join(matrix_output_folder, name) if output_folder is None else output_folder}
 
-            # TODO: This needs to be verified with CR version like above or/and with applicable drive name
 
-            if name in ['Average Power'] and cr == 'MV_CR1':
-                dataframe['Online Maximum'].values[idx] = eval("2*sqrt(3)*Rated_Volts*Rated_Amps/1000", eval_dict)
+def GetMatrixVariants():
 
-            if name in ['Real Power', 'Reactive Power', 'Avg Reactive Pwr', 'Apparent Power', 'Avg Apparent Pwr',
-                        'Projctd kWDmnd', 'Projctd kVARDmnd', 'Projctd kVADmnd']:
-                dataframe['Online Maximum'].values[idx] = eval("2*sqrt(3)*Rated_Volts*Rated_Amps/1000", eval_dict)
+    """ This function is designed to return all combinations of tested drives, firmware revisions and applicability
+    columns from matrix_firmware_revisions and matrix_applicable_to_column_names.
+    :return: list[dict] Variants returned by GetVariant
+    """
 
-            if name in ['Emb Enet Ref', 'Port 1 Reference', 'Port 2 Reference', 'Port 3 Reference', 'Port 4 Reference',
-                        'Port 5 Reference', 'Port 6 Reference', 'Purge Frequency', 'Emb Logic Ref']:
-                dataframe['Online Maximum'].values[idx] = eval("120*120/Motor_Poles", eval_dict)
-                dataframe['Online Minimum'].values[idx] = eval("-120*120/Motor_Poles", eval_dict)
+    return [GetVariant(family_text, major_rev, minor_rev, applicable_to)
+            for family_text in sorted(matrix_firmware_revisions)
+            for major_rev, minor_rev in matrix_firmware_revisions[family_text]
+            for applicable_to in matrix_applicable_to_column_names]
 
-            if name == 'Enclosure Type':
-                dataframe['Online Default'].values[idx] = dhcf_file['Drive Enclosure Type']
 
-            if name == 'Duty Rating Act':
-                dataframe['Online Default'].values[idx] = dhcf_file['Drive OverLoad Rating']
+def GetVariantsColumns(variants):
 
-            if name == 'Purge Frequency':
-                dataframe['Online Default'].values[idx] = eval("30*120/Motor_Poles", eval_dict)
+    """ This function is designed to return columns which have to be imported for all variants.
+    :param variants: list[dict] Variants returned by GetVariant
+    :return: list[str] columns_to_import extended with "Applicable to" columns of the variants
+    """
 
-            if name == 'Drive Power Cfg':
-                dataframe['Online Default'].values[idx] = dhcf_file['Power System Configuration']
+    column_names = list(columns_to_import)
+    for variant in variants:
+        if variant['applicable_to_column_name'] not in column_names:
+            column_names.append(variant['applicable_to_column_name'])
+    return column_names
 
-            if name == 'Drive Frame':
-                dataframe['Online Default'].values[idx] = dhcf_file['Drive Frame Size']
 
-            if name == 'Prchrg Option':
-                dataframe['Online Default'].values[idx] = dhcf_file['PreCharge Option']
+def GetSheetCacheFileName(workbook_hash, sheet_name, column_names, cache_folder):
 
-            if name == 'Main/Inp DvcType':
-                dataframe['Online Default'].values[idx] = 3  # (Hybrid)
+    """ This function is designed to return path of the cache file of the parsed sheet. Cache key is created from the
+    hash of the workbook, name of the sheet and imported columns, so the cache file isn't used when any of them change.
+    :param workbook_hash: [str] md5 hash of the excel file
+    :param sheet_name: [str] Name of the sheet
+    :param column_names: list[str] Names of the imported columns
+    :param cache_folder: [str] Path to the folder with cache files
+    :return: [str] Path of the cache file
+    """
 
-            if name == 'Output Dvc Type':
-                if dhcf_file['Power System Configuration'] == '0':
-                    dataframe['Online Default'].values[idx] = 0  # (NotInstalled)
-                elif dhcf_file['Power System Configuration'] in ['1', '4', '5']:
-                    dataframe['Online Default'].values[idx] = 1  # (1-Coil)
+    cache_key = hashlib.md5(workbook_hash + sheet_name.encode('utf-8') + repr(list(column_names))).hexdigest()
+    return os.path.join(cache_folder, '{}.{}.pkl'.format(sheet_name, cache_key))
 
-            if name == 'Bypass Dvc Type':
-                if dhcf_file['Power System Configuration'] in ['4', '5']:
-                    dataframe['Online Default'].values[idx] = 1  # (1-Coil)
-                else:
-                    dataframe['Online Default'].values[idx] = 0  # (NotInstalled)
 
-            if name == 'Prchrg Dvc Type':
-                if dhcf_file['PreCharge Option'] != '0':
-                    dataframe['Online Default'].values[idx] = 2  # (2-Coil)
-                else:
-                    dataframe['Online Default'].values[idx] = 0  # (NotInstalled)
+def ReadCachedSheet(cache_file_name):
 
-            if name == 'Output Dvc Cfg':
-                dataframe['Online Default'].values[idx] = 0  # (DrvRunning)
+    """ This function is designed to read parsed sheet from the cache file.
+    :param cache_file_name: [str] Path of the cache file
+    :return: [dataframe] Pandas output object or None when sheet isn't cached
+    """
 
-    return dataframe
+    if cache_file_name is None or not os.path.isfile(cache_file_name):
+        return None
+    return pandas.read_pickle(cache_file_name)
 
 
-def FilterByFirmwareRev(major_rev, minor_rev, family_text):
-    crs_to_skip_list = []
-    if family_text == "PF6000T":
-        crs_to_skip_list = crs_to_skip_definitions.pf6000t
+def SaveCachedSheet(dataframe, cache_file_name):
+
+    """ This function is designed to save parsed sheet in the cache file. Cache files of the previous versions of the
+    workbook are removed. Pickle is used, because the sheets contain columns with mixed datatypes (e.g. "TBD" in
+    "New Parameter Number") which can't be stored in columnar formats like feather.
+    :param dataframe: [dataframe] Pandas input object (parsed sheet)
+    :param cache_file_name: [str] Path of the cache file
+    """
+
+    cache_folder, current_file_name = os.path.split(cache_file_name)
+    sheet_name = current_file_name[:current_file_name.rindex('.', 0, -len('.pkl'))]
+
+    if not os.path.exists(cache_folder):
+        os.makedirs(cache_folder)
+
+    for cached_file_name in os.listdir(cache_folder):
+        if cached_file_name.startswith(sheet_name + '.') and cached_file_name.count('.') == sheet_name.count('.') + 2 \
+                and cached_file_name != current_file_name:
+            os.unlink(os.path.join(cache_folder, cached_file_name))
+
+    dataframe.to_pickle(cache_file_name)
+
+
+def GetSheetsCacheFileNames(excel_file_name, sheet_names, column_names, cache_folder):
+
+    """ This function is designed to return paths of the cache files of the sheets of the workbook.
+    :param excel_file_name: [str] Path of the excel file
+    :param sheet_names: list[str] Names of the sheets
+    :param column_names: list[str] Names of the imported columns
+    :param cache_folder: [str] Path to the folder with cache files (None = cache isn't used)
+    :return: list[str] Paths of the cache files (None for every sheet if cache isn't used)
+    """
+
+    if cache_folder is None:
+        return [None] * len(sheet_names)
+
+    workbook_hash = GetFileHash(excel_file_name)
+    return [GetSheetCacheFileName(workbook_hash, sheet_name, column_names, cache_folder) for sheet_name in sheet_names]
+
+
+def ReadSheets(excel_file_name, sheet_names, column_names, cache_file_names=None):
+
+    """ This function is designed to read sheets of the workbook. Cached sheets are read from the cache files, the
+    workbook is parsed only when some sheet isn't cached.
+    :param excel_file_name: [str] Path of the excel file
+    :param sheet_names: list[str] Names of the sheets
+    :param column_names: list[str] Names of the imported columns
+    :param cache_file_names: list[str] Paths returned by GetSheetsCacheFileNames (None = cache isn't used)
+    :return: list[dataframe] Parsed sheets in the order of sheet_names
+    """
+
+    if cache_file_names is None:
+        cache_file_names = [None] * len(sheet_names)
+
+    with profiler.Stage('parse') as stage_record:
+        hpc_dbase_dataframe = None
+        dataframes = []
+        for sheet_to_parse, cache_file_name in zip(sheet_names, cache_file_names):
+            dataframe = ReadCachedSheet(cache_file_name)
+            if dataframe is None:
+                # Create Pandas dataframe object only when some sheet isn't cached
+                if hpc_dbase_dataframe is None:
+                    hpc_dbase_dataframe = pandas.ExcelFile(excel_file_name)
+
+                # Parse only required sheets from excel file
+                dataframe = hpc_dbase_dataframe.parse(sheet_name=sheet_to_parse, usecols=column_names)
+                if cache_file_name is not None:
+                    SaveCachedSheet(dataframe, cache_file_name)
+            dataframes.append(dataframe)
+        stage_record['rows_out'] = sum(len(dataframe) for dataframe in dataframes)
+
+    return dataframes
+
+
+def ParseSheet(file_name, sheet_name, column_names):
+
+    """ This function is designed to parse only one sheet of the excel file. xlrd always reads all sheets of the
+    workbook, so the sheet is read with openpyxl in read-only mode and converted by the same parser as in
+    pandas.read_excel. Without openpyxl pandas.read_excel is used.
+    :param file_name: [str] Path of the excel file
+    :param sheet_name: [str] Name of the sheet to parse
+    :param column_names: list[str] Names of the columns to import
+    :return: [dataframe] Pandas output object
+    """
+
+    if openpyxl is None:
+        return pandas.read_excel(file_name, sheet_name=sheet_name, usecols=column_names)
+
+    workbook = openpyxl.load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        # Empty cells are passed to the parser like from xlrd
+        rows = [[u'' if value is None else value for value in row] for row in workbook[sheet_name].values]
+    finally:
+        workbook.close()
+
+    return TextParser(rows, header=0, usecols=column_names).read()
+
+
+def SaveSheetTables(dataframe, sheet_name, dhcf_configurations, variants=None, exporter=None):
+
+    """ This function is designed to modify parsed sheet and save it for every variant. Steps shared by all variants
+    are done only once. Port 0 ICB Parameters depend on DHCF, so they are saved for every configuration, other sheets
+    only once per variant.
+    :param dataframe: [dataframe] Pandas input object (parsed sheet)
+    :param sheet_name: [str] Name of the sheet
+    :param dhcf_configurations: list[DhcfConfiguration] Configurations of the drives
+    :param variants: list[dict] Variants returned by GetVariant (tested drive from EDIT SECTION if None)
+    :param exporter: [TableExporter] Exporter of the tables (xlsx files if None)
+    :return: list[str] Names of the saved files
+    """
+
+    if variants is None:
+        variants = [default_variant]
+    if exporter is None:
+        exporter = TableExporter()
+
+    if sheet_name == "Port 0 ICB Parameters":
+        configurations = dhcf_configurations
     else:
-        if major_rev == 1:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_1
-        elif major_rev == 2:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_2
-        elif major_rev == 3:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_3
-        elif major_rev == 4:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_4
-        elif major_rev == 5:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_5
-        elif major_rev == 6:
-            if minor_rev == 3:
-                crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_6_3
-            elif minor_rev == 4:
-                crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_6_4
-        elif major_rev == 7:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_7
-        elif major_rev == 8:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_8
-        elif major_rev == 10:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_10
-        elif major_rev == 11:
-            crs_to_skip_list = crs_to_skip_definitions.pf755t_rev_11
-
-    return crs_to_skip_list
+        configurations = dhcf_configurations[:1]
+
+    # Data modifications shared by all variants
+    base_dataframe = BaseModifications(dataframe, sheet_name)
+
+    saved_files = []
+    for variant in variants:
+        # Only the "Applicable to" column of the variant is saved (in the order of the sheet)
+        output_columns = [column_name for column_name in base_dataframe.columns
+                          if column_name == variant['applicable_to_column_name'] or
+                          (column_name in columns_to_import and column_name != applicable_to_column_name)]
+
+        for dhcf in configurations:
+            output_name = sheet_name
+            if len(configurations) > 1:
+                output_name = "{} ({})".format(sheet_name, dhcf.name)
+
+            # Data modifications section
+            modified_dataframe = VariantModifications(base_dataframe, sheet_name, variant, dhcf)[output_columns]
+
+            # Save modified dataframes in selected format
+            with profiler.Stage('export', len(modified_dataframe)):
+                output_file_name = exporter.Save(modified_dataframe, variant['output_folder'], output_name)
+            print "File {} saved successfully".format(output_file_name)
+            print "*" * 100
+            saved_files.append(output_file_name)
+
+    return saved_files
+
+
+def ProcessSheet(task):
+
+    """ This function is designed to parse, modify and save one sheet of HPC Database. Function is run in the worker
+    process, errors are returned in the status instead of stopping other sheets.
+    :param task: [tuple] Path of the excel file, name of the sheet, list of DHCF configurations, path of the cache
+    file of the sheet (None = cache isn't used), list of variants, list of columns to import, export format and
+    profile and cprofile flags of the main process
+    :return: [dict] Sheet name, status, number of parsed rows, saved files, time, profiled stages of the sheet
+    and the slowest stage profiled with cProfile
+    """
+
+    excel_file_name, sheet_name, dhcf_configurations, cache_file_name, variants, column_names, export_format, \
+        profile, cprofile = task
+
+    # Worker processes started without fork (Windows) don't inherit enabled profiler of the main process
+    if profile:
+        profiler.Enable(cprofile)
+    # Only stages of this sheet are returned to the main process
+    profiler.records = []
+    profiler.slowest_profile = None
+    profiler.slowest_seconds = -1.0
+    status = {'sheet': sheet_name, 'status': 'Saved', 'rows': None, 'files': [], 'seconds': None}
+    start_time = time.time()
+
+    try:
+        with profiler.Stage('parse') as stage_record:
+            dataframe = ReadCachedSheet(cache_file_name)
+            if dataframe is None:
+                dataframe = ParseSheet(excel_file_name, sheet_name, column_names)
+                if cache_file_name is not None:
+                    SaveCachedSheet(dataframe, cache_file_name)
+            stage_record['rows_out'] = len(dataframe)
+        status['rows'] = len(dataframe)
+        status['files'] = SaveSheetTables(dataframe, sheet_name, dhcf_configurations, variants,
+                                          TableExporter(export_format))
+    except Exception as e:
+        status['status'] = 'Error: {}'.format(str(e) or e.__class__.__name__)
+
+    status['seconds'] = time.time() - start_time
+    status['records'] = profiler.records
+    status['slowest_stage'] = profiler.GetSlowestStage()
+    return status
+
+
+def FilterByFirmwareRev(major_rev, minor_rev, family_text):
+
+    """ This function is designed to return CRs which are not applicable to the tested drive and firmware revision
+    (see drive_families in crs_to_skip_definitions.py).
+    :param major_rev: [int] Major firmware revision
+    :param minor_rev: [int] Minor firmware revision
+    :param family_text: [str] Drive family, e.g. "PF6000T" or "PF755T"
+    :return: [frozenset] CRs to skip
+    """
+
+    return crs_to_skip_definitions.GetCrsToSkip(family_text, major_rev, minor_rev)
 
 
 '''**************************************************'''
@@ -266,9 +604,31 @@ columns_to_import = ["Name",
 
 names_to_skip = ["Reserved"]
 
+# Regular expressions of the values to skip in the sheets, key = sheet name and value = list of (column name, regex)
+sheets_regex_skips = {"Port 12 PCCB Parameters": [('Name', re.compile('U1|W1|V1|U2|W2|V2|U3|W3|V3|U4|W4|V4|U5|W5|V5|'
+                                                                      'U6|W6|V6|U7|W7|V7|U8|W8|V8|U9|W9|V9'))],
+                      "Port 14 PIOB Parameters": [('New Parameter Number', re.compile('TBD'))]}
+
 applicable_values_to_skip = ['No', '']
 
 applicable_to_column_name = "Applicable to PF6000T?"
+
+# Rating of the tested drive used in the formulas of online_override_rules
+default_rating = {'Rated_Volts': 480,
+                  'Rated_Current': 20,
+                  'Rated_Amps': 20,
+                  'Motor_Poles': 4,
+                  'Rated_kW': 0.86}
+
+# Matrix mode (--matrix) - every combination of tested drive, firmware revision and "Applicable to" column is saved
+# in separate folder of matrix_output_folder
+matrix_firmware_revisions = {'PF6000T': [(1, 1)],
+                             'PF755T': [(1, 0), (2, 0), (3, 0), (4, 0), (6, 3), (6, 4), (7, 0), (10, 0), (11, 0)]}
+
+matrix_applicable_to_column_names = ["Applicable to PF6000T?",
+                                     "Applicable to Integrated AFE Drives (PF755TR)?"]
+
+matrix_output_folder = "Variants"
 '''**************************************************'''
 
 '''**************************************************'''
@@ -278,6 +638,15 @@ applicable_to_column_name = "Applicable to PF6000T?"
 
 file_name = "HPC Database - Draft.xlsm"
 
+# Folder in which parsed sheets of the workbook are cached
+sheets_cache_folder = "Cache"
+
+# Override rules of the Online values compiled once per process
+compiled_online_override_rules = CompileOverrideRules(online_override_rules)
+
+# DHCF files of the drive configurations, Port 0 ICB Parameters table is generated for every configuration
+dhcf_file_names = ['dhcf.json']
+
 crs_priorities_dict = {'CRx': 19,
                        'CR1': 18,
                        'Dev CR1': 17,
@@ -304,21 +673,95 @@ minor_fw_rev = 1
 
 # Based on firmware revision and family text define CRs which should be skipped
 crs_to_skip = FilterByFirmwareRev(major_fw_rev, minor_fw_rev, tested_drive)
+
+# Variant generated by default, files are saved in the current folder
+default_variant = GetVariant(tested_drive, major_fw_rev, minor_fw_rev, applicable_to_column_name, '')
 '''**************************************************'''
 
 if __name__ == "__main__":
-    # Create Pandas dataframe object
-    hpc_dbase_dataframe = pandas.ExcelFile(file_name)
-
-    # Parse only required sheets from excel file
-    ports_dataframes = [hpc_dbase_dataframe.parse(sheet_name=sheet_to_parse, usecols=columns_to_import) for
-                        sheet_to_parse in sheets_to_parse]
-
-    for sheet_number, sheet_name in enumerate(sheets_to_parse):
-        # Data modifications section
-        ports_dataframes[sheet_number] = DataframeModifications(ports_dataframes[sheet_number], sheet_name)
-
-        # Print modified dataframes to excel
-        ports_dataframes[sheet_number].to_excel(sheets_to_parse[sheet_number] + '.xlsx', index=False)
-        print "File {}.xlsm saved successfully".format(sheets_to_parse[sheet_number])
-        print "*" * 100
+    parser = argparse.ArgumentParser(description='Generation of the parameter tables from HPC Database')
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure time, rows and memory of every stage and save summary in Profile.json')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='With --profile, save cProfile statistics of the slowest stage in SlowestStage.prof')
+    parser.add_argument('--dhcf', nargs='+', default=dhcf_file_names,
+                        help='DHCF files of the drive configurations (Port 0 table is generated for every file)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse all sheets from the workbook instead of reading them from {} folder'.format(
+                            sheets_cache_folder))
+    parser.add_argument('--matrix', action='store_true',
+                        help='Save tables of every variant from matrix_firmware_revisions and '
+                             'matrix_applicable_to_column_names in {} folder'.format(matrix_output_folder))
+    parser.add_argument('--export', choices=export_formats, default='xlsx',
+                        help='Format of the saved tables: xlsx file per table, one workbook per output folder, csv or '
+                             'feather file per table')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Parse, modify and save every sheet in separate process')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='With --parallel, number of worker processes (one per sheet up to number of cores)')
+    arguments = parser.parse_args()
+
+    if arguments.parallel and arguments.export == 'workbook':
+        parser.error('Tables can be saved in one workbook only without --parallel')
+
+    if arguments.profile:
+        profiler.Enable(arguments.cprofile)
+
+    # Every DHCF file is parsed only once, also when many configurations are generated
+    dhcf_configurations = LoadDhcfConfigurations(arguments.dhcf)
+
+    # Every sheet is parsed and filtered by the shared steps once for all variants
+    variants = GetMatrixVariants() if arguments.matrix else [default_variant]
+    import_columns = GetVariantsColumns(variants)
+
+    # Parsed sheets are cached until the workbook or imported columns change
+    cache_file_names = GetSheetsCacheFileNames(file_name, sheets_to_parse, import_columns,
+                                               None if arguments.no_cache else sheets_cache_folder)
+
+    if arguments.parallel:
+        # Every sheet is parsed, modified and saved in separate process
+        tasks = [(file_name, sheet_name, dhcf_configurations, cache_file_name, variants, import_columns,
+                  arguments.export, arguments.profile, arguments.cprofile)
+                 for sheet_name, cache_file_name in zip(sheets_to_parse, cache_file_names)]
+
+        pool = multiprocessing.Pool(arguments.jobs or min(len(tasks), multiprocessing.cpu_count()))
+        try:
+            sheets_statuses = []
+            for sheet_status in pool.imap_unordered(ProcessSheet, tasks):
+                profiler.records.extend(sheet_status.pop('records'))
+                # cProfile statistics of the slowest stage of every sheet compete with the stages of other sheets
+                slowest_stage = sheet_status.pop('slowest_stage')
+                if slowest_stage is not None:
+                    profiler.AddProfiledStage(*slowest_stage)
+                sheets_statuses.append(sheet_status)
+                print "Sheet {} processed in {:.3f} s: {}".format(sheet_status['sheet'], sheet_status['seconds'],
+                                                                 sheet_status['status'])
+        finally:
+            pool.close()
+            pool.join()
+
+        failed_sheets = [sheet_status['sheet'] for sheet_status in sheets_statuses
+                         if sheet_status['status'] != 'Saved']
+        if failed_sheets:
+            print "Sheets not saved: {}".format(', '.join(failed_sheets))
+    else:
+        ports_dataframes = ReadSheets(file_name, sheets_to_parse, import_columns, cache_file_names)
+
+        table_exporter = TableExporter(arguments.export)
+        try:
+            for sheet_number, sheet_name in enumerate(sheets_to_parse):
+                SaveSheetTables(ports_dataframes[sheet_number], sheet_name, dhcf_configurations, variants,
+                                table_exporter)
+        finally:
+            with profiler.Stage('export'):
+                table_exporter.Close()
+
+    if arguments.profile:
+        profiler.SaveSummary('Profile.json')
+        print "File Profile.json saved successfully!"
+        for stage in profiler.Summary():
+            print "{:<25} {:>4} calls {:10.3f} s".format(stage['stage'], stage['calls'], stage['seconds'])
+
+        slowest_stage = profiler.SaveSlowestStageProfile('SlowestStage.prof')
+        if slowest_stage is not None:
+            print "File SlowestStage.prof saved successfully! (stage: {})".format(slowest_stage)
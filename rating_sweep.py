@@ -0,0 +1,268 @@
+import pandas
+import numpy
+import argparse
+import os
+from math import sqrt
+
+import pandas_training
+from dhcf_configuration import LoadDhcfConfiguration, LoadDhcfConfigurations
+from stage_profiler import profiler
+from table_export import TableExporter, export_formats
+
+
+class DhcfValues(object):
+    """ This class returns values of the DHCF key of many drive configurations at once, e.g. dhcf['PreCharge Option']
+    returns array with one value per configuration, so formulas of the override rules can be calculated for all
+    configurations in one operation.
+    """
+
+    def __init__(self, dhcf_configurations):
+
+        """ :param dhcf_configurations: list[DhcfConfiguration] Configurations of the drives
+        """
+
+        self.dhcf_configurations = dhcf_configurations
+        self.values = {}
+
+    def __getitem__(self, key):
+        if key not in self.values:
+            self.values[key] = numpy.array([dhcf[key] for dhcf in self.dhcf_configurations])
+        return self.values[key]
+
+    def Text(self, key):
+
+        """ This method returns values of the DHCF key as text (see DhcfConfiguration.Text).
+        :param key: [str] DHCF key, e.g. 'Drive Enclosure Type'
+        :return: [ndarray] Text value of every configuration
+        """
+
+        return numpy.array([dhcf.Text(key) for dhcf in self.dhcf_configurations], dtype=object)
+
+
+def ReadRatings(file_name):
+
+    """ This function is designed to read table of drive ratings from csv file. Every row is one rating, columns are
+    the names used in the formulas of the override rules (e.g. Rated_Volts). Missing columns are filled with the values
+    of default_rating.
+    :param file_name: [str] Path of the csv file
+    :return: [dataframe] Ratings with Rating (name) column and one column per rating value
+    """
+
+    ratings = pandas.read_csv(file_name)
+    if 'Rating' not in ratings.columns:
+        ratings['Rating'] = ['Rating {}'.format(number) for number in range(1, len(ratings) + 1)]
+
+    for rating_column_name in rating_column_names:
+        if rating_column_name not in ratings.columns:
+            ratings[rating_column_name] = pandas_training.default_rating[rating_column_name]
+
+    return ratings[['Rating'] + rating_column_names]
+
+
+def GetDhcfRatings(dhcf_configurations):
+
+    """ This function is designed to read drive ratings from DHCF files. Values which aren't stored in DHCF file
+    (dhcf_rating_keys) are taken from default_rating.
+    :param dhcf_configurations: list[DhcfConfiguration] Configurations of the drives
+    :return: [dataframe] Ratings with Rating (name of the DHCF file) column and one column per rating value
+    """
+
+    ratings = pandas.DataFrame({'Rating': [dhcf.name for dhcf in dhcf_configurations]})
+    for rating_column_name in rating_column_names:
+        dhcf_key = dhcf_rating_keys.get(rating_column_name)
+        ratings[rating_column_name] = [dhcf.Get(dhcf_key, pandas_training.default_rating[rating_column_name])
+                                       for dhcf in dhcf_configurations]
+
+    return ratings[['Rating'] + rating_column_names]
+
+
+def EvaluateForRatings(code, eval_dict, scalar_eval_dicts):
+
+    """ This function is designed to calculate formula or condition for all ratings at once. Rating values in eval_dict
+    are arrays, so arithmetic formulas give array with one value per rating. Python conditional expressions can't be
+    calculated for arrays, such formulas are calculated separately for every rating.
+    :param code: [code] Compiled formula or condition
+    :param eval_dict: [dict] Names used in the formula with one array of values per rating value
+    :param scalar_eval_dicts: [function] Function returning list of eval dictionaries, one per rating
+    :return: [ndarray] Value for every rating
+    """
+
+    ratings_count = len(eval_dict['Rated_Volts'])
+    try:
+        return numpy.broadcast_to(eval(code, eval_dict), (ratings_count,))
+    except (ValueError, TypeError):
+        return numpy.array([eval(code, scalar_eval_dict) for scalar_eval_dict in scalar_eval_dicts()])
+
+
+@profiler.Profiled('SweepOnlineValues')
+def SweepOnlineValues(dataframe, ratings, dhcf, compiled_rules=None, applicable_to=None):
+
+    """ This function is designed to calculate Online Minimum, Maximum and Default values of the ICB parameters for
+    every rating. Values of all ratings and parameters are stored in one array per column, so every rule is applied
+    to all ratings with one array operation.
+    :param dataframe: [dataframe] Pandas input object (Port 0 ICB Parameters without calculated Online values)
+    :param ratings: [dataframe] Ratings returned by ReadRatings or GetDhcfRatings
+    :param dhcf: [DhcfConfiguration] Configuration used for all ratings or list[DhcfConfiguration] with one
+    configuration per rating
+    :param compiled_rules: list[dict] Rules returned by CompileOverrideRules (compiled online_override_rules if None)
+    :param applicable_to: [str] Name of the "Applicable to" column of the tested drive (applicable_to_column_name
+    if None)
+    :return: [dataframe] Pandas output object with one row per rating and parameter
+    """
+
+    if compiled_rules is None:
+        compiled_rules = pandas_training.compiled_online_override_rules
+    if applicable_to is None:
+        applicable_to = pandas_training.applicable_to_column_name
+
+    ratings_count = len(ratings)
+    dhcf_configurations = dhcf if isinstance(dhcf, list) else [dhcf] * ratings_count
+
+    eval_dict = {rating_column_name: ratings[rating_column_name].values for rating_column_name in rating_column_names}
+    eval_dict.update({'sqrt': numpy.sqrt,
+                      'dhcf': DhcfValues(dhcf_configurations) if isinstance(dhcf, list) else dhcf,
+                      'applicable_to': applicable_to})
+
+    def ScalarEvalDicts():
+        scalar_eval_dicts = []
+        for rating, rating_dhcf in zip(ratings[rating_column_names].to_dict('records'), dhcf_configurations):
+            rating.update({'sqrt': sqrt,
+                           'dhcf': rating_dhcf,
+                           'applicable_to': applicable_to})
+            scalar_eval_dicts.append(rating)
+        return scalar_eval_dicts
+
+    # One row per rating and one column per parameter
+    column_names = sweep_column_names + [rule['column'] for rule in compiled_rules
+                                         if rule['column'] not in sweep_column_names]
+    values = {column_name: numpy.tile(dataframe[column_name].values, (ratings_count, 1))
+              for column_name in set(column_names)}
+
+    names = dataframe['Name']
+    crs = dataframe['Commercial Release'].values
+
+    for rule in compiled_rules:
+        parameters_mask = names.isin(rule['names']).values
+        if rule['cr'] is not None:
+            parameters_mask &= crs == rule['cr']
+        if not parameters_mask.any():
+            continue
+
+        if rule['condition'] is None:
+            ratings_mask = numpy.ones(ratings_count, dtype=bool)
+        else:
+            ratings_mask = EvaluateForRatings(rule['condition'], eval_dict, ScalarEvalDicts).astype(bool)
+        if not ratings_mask.any():
+            continue
+
+        # Value of every rating is written to all matching parameters (converted to the datatype of the column)
+        rule_values = EvaluateForRatings(rule['formula'], eval_dict, ScalarEvalDicts)
+        values[rule['column']][numpy.ix_(ratings_mask, parameters_mask)] = rule_values[ratings_mask][:, numpy.newaxis]
+
+    parameters_count = len(dataframe)
+    sweep_dataframe = pandas.DataFrame({column_name: numpy.repeat(ratings[column_name].values, parameters_count)
+                                        for column_name in ratings.columns})
+    for column_name in ["New Parameter Number", "Name", "Commercial Release"]:
+        sweep_dataframe[column_name] = numpy.tile(dataframe[column_name].values, ratings_count)
+    for column_name in column_names:
+        sweep_dataframe[column_name] = values[column_name].ravel()
+
+    return sweep_dataframe[ratings.columns.tolist() + ["New Parameter Number", "Name", "Commercial Release"] +
+                           column_names]
+
+
+def GenerateRatingSweep(excel_file_name, ratings, dhcf, cache_folder=None):
+
+    """ This function is designed to generate Online values of Port 0 ICB Parameters of the tested drive (EDIT SECTION
+    of pandas_training.py) for every rating.
+    :param excel_file_name: [str] Path of HPC Database
+    :param ratings: [dataframe] Ratings returned by ReadRatings or GetDhcfRatings
+    :param dhcf: [DhcfConfiguration] Configuration used for all ratings or list[DhcfConfiguration] with one
+    configuration per rating
+    :param cache_folder: [str] Path to the folder with parsed sheets (None = cache isn't used)
+    :return: [dataframe] Online values with one row per rating and parameter
+    """
+
+    cache_file_names = pandas_training.GetSheetsCacheFileNames(excel_file_name, [sweep_sheet_name],
+                                                               pandas_training.columns_to_import, cache_folder)
+    dataframe = pandas_training.ReadSheets(excel_file_name, [sweep_sheet_name], pandas_training.columns_to_import,
+                                           cache_file_names)[0]
+
+    dataframe = pandas_training.VariantModifications(pandas_training.BaseModifications(dataframe, sweep_sheet_name),
+                                                     sweep_sheet_name, pandas_training.default_variant,
+                                                     online_values=False)
+
+    return SweepOnlineValues(dataframe, ratings, dhcf,
+                             applicable_to=pandas_training.default_variant['applicable_to_column_name'])
+
+
+'''**************************************************'''
+'''MAINTENANCE SECTION - this variables need to be   '''
+'''maintained when changes in HPC Database Draft     '''
+'''will appear.                                      '''
+
+# Sheet with the parameters calculated from the drive rating
+sweep_sheet_name = "Port 0 ICB Parameters"
+
+# Columns of the sweep table calculated for every rating
+sweep_column_names = ["Online Minimum",
+                      "Online Maximum",
+                      "Online Default"]
+
+# Names of the rating values used in the formulas of online_override_rules
+rating_column_names = ['Rated_Volts',
+                       'Rated_Current',
+                       'Rated_Amps',
+                       'Motor_Poles',
+                       'Rated_kW']
+
+# DHCF keys of the rating values, values which aren't stored in DHCF file are taken from default_rating
+dhcf_rating_keys = {'Rated_Volts': 'Nominal System Voltage',
+                    'Rated_Current': 'Drive Current Rating',
+                    'Rated_Amps': 'Drive Current Rating'}
+'''**************************************************'''
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Online values of Port 0 ICB Parameters calculated for many drive '
+                                                 'ratings')
+    ratings_source = parser.add_mutually_exclusive_group(required=True)
+    ratings_source.add_argument('--ratings',
+                                help='csv file with one rating per row (columns: Rating, {})'.format(
+                                    ', '.join(rating_column_names)))
+    ratings_source.add_argument('--dhcf', nargs='+',
+                                help='DHCF files of the drive configurations (one rating per file)')
+    parser.add_argument('--ratings-dhcf', default=pandas_training.dhcf_file_names[0],
+                        help='With --ratings, DHCF file of the drive configuration used for all ratings')
+    parser.add_argument('--output', default='',
+                        help='Folder in which Rating Sweep table is saved')
+    parser.add_argument('--export', choices=export_formats, default='csv',
+                        help='Format of the saved table')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse the sheet from the workbook instead of reading it from {} folder'.format(
+                            pandas_training.sheets_cache_folder))
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure time, rows and memory of every stage and save summary in Profile.json')
+    arguments = parser.parse_args()
+
+    if arguments.profile:
+        profiler.Enable()
+
+    if arguments.dhcf:
+        sweep_dhcf = LoadDhcfConfigurations(arguments.dhcf)
+        sweep_ratings = GetDhcfRatings(sweep_dhcf)
+    else:
+        sweep_dhcf = LoadDhcfConfiguration(arguments.ratings_dhcf)
+        sweep_ratings = ReadRatings(arguments.ratings)
+
+    rating_sweep = GenerateRatingSweep(pandas_training.file_name, sweep_ratings, sweep_dhcf,
+                                       None if arguments.no_cache else pandas_training.sheets_cache_folder)
+    print "{} ratings x {} parameters calculated".format(len(sweep_ratings),
+                                                         len(rating_sweep) // max(len(sweep_ratings), 1))
+
+    exporter = TableExporter(arguments.export)
+    print "File {} saved successfully".format(exporter.Save(rating_sweep, arguments.output, 'Rating Sweep'))
+    exporter.Close()
+
+    if arguments.profile:
+        profiler.SaveSummary(os.path.join(arguments.output, 'Profile.json'))
+        print "File Profile.json saved successfully!"
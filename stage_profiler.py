@@ -0,0 +1,206 @@
+import cProfile
+import contextlib
+import functools
+import json
+import marshal
+import os
+import time
+
+import pandas
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 has no tracemalloc, resident memory from psutil is used instead
+    tracemalloc = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def GetMemoryUsage():
+    """ This function returns memory used by the process in bytes (traced memory on Python 3, resident memory on
+    Python 2 with psutil) or None when it can't be measured.
+    """
+    if tracemalloc is not None:
+        return tracemalloc.get_traced_memory()[0]
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss
+    return None
+
+
+def CountRows(value):
+    """ This function returns number of rows of the dataframe. If value is a tuple or list, rows of its first dataframe
+    are counted.
+
+    :param value: Pandas dataframe object, tuple/list of values or any other object
+    :return: [int] Number of rows or None when value doesn't contain dataframe
+    """
+    if isinstance(value, pandas.DataFrame):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        for item in value:
+            if isinstance(item, pandas.DataFrame):
+                return len(item)
+    return None
+
+
+class StageProfiler(object):
+    """ This class records wall time, number of rows in/out and memory delta of every pipeline stage. When disabled,
+    stages are run without any measurement. Optionally every top level stage is profiled with cProfile and statistics
+    of the slowest one can be saved.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.cprofile = False
+        self.records = []
+        self.depth = 0
+        self.slowest_profile = None
+        self.slowest_seconds = -1.0
+
+    def Enable(self, cprofile=False):
+        """ This method enables measurement of stages.
+
+        :param cprofile: [bool] Profile every top level stage with cProfile
+        """
+        self.enabled = True
+        self.cprofile = cprofile
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def Stage(self, name, rows_in=None):
+        """ This method is a context manager which measures the stage run inside it. Number of output rows can be set
+        with record['rows_out'] = value.
+
+        :param name: [str] Name of the stage
+        :param rows_in: [int] Number of input rows
+        """
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        if not self.enabled:
+            yield record
+            return
+
+        profile = None
+        if self.cprofile and self.depth == 0:
+            profile = cProfile.Profile()
+
+        memory_before = GetMemoryUsage()
+        self.depth += 1
+        start_time = time.time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record['seconds'] = time.time() - start_time
+            self.depth -= 1
+            memory_after = GetMemoryUsage()
+            record['memory_delta_bytes'] = None if memory_before is None else memory_after - memory_before
+            self.records.append(record)
+
+            if profile is not None:
+                profile.create_stats()
+                self.AddProfiledStage(name, record['seconds'], profile.stats)
+
+    def AddProfiledStage(self, name, seconds, stats):
+        """ This method keeps cProfile statistics of the stage when it is the slowest stage so far. Statistics of the
+        stages profiled in worker processes are added to the profiler of the main process with this method.
+
+        :param name: [str] Name of the stage
+        :param seconds: [float] Wall time of the stage
+        :param stats: [dict] cProfile statistics of the stage (stats attribute of cProfile.Profile or pstats.Stats)
+        """
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_profile = (name, stats)
+
+    def GetSlowestStage(self):
+        """ This method returns the slowest profiled stage, so it can be sent from the worker process to the main one.
+
+        :return: [tuple] Name, wall time and cProfile statistics of the slowest stage or None when no stage was profiled
+        """
+        if self.slowest_profile is None:
+            return None
+        name, stats = self.slowest_profile
+        return name, self.slowest_seconds, stats
+
+    def Profiled(self, name):
+        """ This method returns decorator which measures every call of the decorated function as a stage. Input rows
+        are counted in the first dataframe argument and output rows in the returned value.
+
+        :param name: [str] Name of the stage
+        :return: Decorator
+        """
+        def Decorator(function):
+            @functools.wraps(function)
+            def Wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.Stage(name, CountRows(list(args) + list(kwargs.values()))) as record:
+                    result = function(*args, **kwargs)
+                    record['rows_out'] = CountRows(result)
+                return result
+            return Wrapper
+        return Decorator
+
+    def Summary(self):
+        """ This method aggregates records of the stages by stage name (in order of the first call).
+
+        :return: list[dict] Calls, total/maximum time, rows in/out and memory delta of every stage
+        """
+        summary = []
+        stages = {}
+        for record in self.records:
+            if record['stage'] not in stages:
+                stages[record['stage']] = {'stage': record['stage'],
+                                           'calls': 0,
+                                           'seconds': 0.0,
+                                           'max_seconds': 0.0,
+                                           'rows_in': None,
+                                           'rows_out': None,
+                                           'memory_delta_bytes': None}
+                summary.append(stages[record['stage']])
+            stage = stages[record['stage']]
+            stage['calls'] += 1
+            stage['seconds'] += record['seconds']
+            stage['max_seconds'] = max(stage['max_seconds'], record['seconds'])
+            for key in ['rows_in', 'rows_out', 'memory_delta_bytes']:
+                if record[key] is not None:
+                    stage[key] = (stage[key] or 0) + record[key]
+        return summary
+
+    def SaveSummary(self, file_name):
+        """ This method saves summary of the stages in the json file.
+
+        :param file_name: [str] Path of the json file
+        """
+        with open(file_name, 'w') as f:
+            json.dump({'stages': self.Summary(),
+                       'memory_measurement': 'tracemalloc' if tracemalloc is not None else
+                       'rss' if psutil is not None else None},
+                      f, indent=4, separators=(',', ': '))
+
+    def SaveSlowestStageProfile(self, file_name):
+        """ This method saves cProfile statistics of the slowest top level stage (can be viewed with pstats module or
+        snakeviz).
+
+        :param file_name: [str] Path of the statistics file
+        :return: [str] Name of the slowest stage or None when no stage was profiled
+        """
+        if self.slowest_profile is None:
+            return None
+        name, stats = self.slowest_profile
+        # The same format as cProfile.Profile.dump_stats
+        with open(file_name, 'wb') as f:
+            marshal.dump(stats, f)
+        return name
+
+
+# Profiler shared by all modules of the process. It is enabled with --profile argument of the scripts.
+profiler = StageProfiler()
@@ -0,0 +1,134 @@
+import os
+
+try:
+    import xlsxwriter
+except ImportError:
+    # Without XlsxWriter tables are saved with pandas to_excel and workbook format isn't available
+    xlsxwriter = None
+
+# Formats of the saved tables:
+#   xlsx     - one xlsx file per table written row by row in constant memory
+#   workbook - one xlsx workbook per output folder with one sheet per table
+#   csv      - one csv file per table
+#   feather  - one feather file per table (binary columnar format, requires pyarrow)
+export_formats = ['xlsx', 'workbook', 'csv', 'feather']
+
+# Name of the workbook saved in every output folder in workbook format
+workbook_file_name = "HPC Database Tables.xlsx"
+
+
+def GetRows(dataframe):
+
+    """ This function is designed to convert dataframe to the list of rows with Python values. Empty cells are
+    converted to None.
+    :param dataframe: [dataframe] Pandas input object
+    :return: list[list] Rows of the dataframe
+    """
+
+    return dataframe.astype(object).where(dataframe.notnull(), None).values.tolist()
+
+
+class TableExporter(object):
+    """ This class saves generated tables in the selected format. In workbook format, workbooks of all output folders
+    stay open until Close method is called, every table is added as a new sheet.
+    """
+
+    def __init__(self, export_format='xlsx'):
+
+        """ :param export_format: [str] One of export_formats
+        """
+
+        if export_format not in export_formats:
+            raise ValueError('Unknown export format "{}", available formats: {}'.format(
+                export_format, ', '.join(export_formats)))
+        if export_format == 'workbook' and xlsxwriter is None:
+            raise ValueError('Workbook export format requires XlsxWriter')
+
+        self.export_format = export_format
+        self.workbooks = {}
+
+    def Save(self, dataframe, output_folder, table_name):
+
+        """ This method saves one table.
+        :param dataframe: [dataframe] Pandas input object (generated table)
+        :param output_folder: [str] Path to the folder in which table is saved ('' = current folder)
+        :param table_name: [str] Name of the table (name of the file or sheet)
+        :return: [str] Path of the saved file (with sheet name in workbook format)
+        """
+
+        if output_folder and not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+
+        if self.export_format == 'workbook':
+            return self.SaveWorkbookSheet(dataframe, output_folder, table_name)
+
+        file_name = os.path.join(output_folder, '{}.{}'.format(table_name, self.export_format))
+
+        if self.export_format == 'xlsx':
+            if xlsxwriter is None:
+                dataframe.to_excel(file_name, index=False)
+            else:
+                workbook = xlsxwriter.Workbook(file_name, {'constant_memory': True})
+                self.WriteSheet(workbook, table_name, dataframe)
+                workbook.close()
+        elif self.export_format == 'csv':
+            dataframe.to_csv(file_name, index=False, encoding='utf-8')
+        else:
+            # Feather stores one datatype per column, values of the text columns with mixed datatypes are saved as text
+            feather_dataframe = dataframe.reset_index(drop=True)
+            for column_name in feather_dataframe.columns:
+                if feather_dataframe[column_name].dtype == object:
+                    column = feather_dataframe[column_name]
+                    feather_dataframe[column_name] = column.where(column.isnull(), column.astype(unicode))
+            feather_dataframe.to_feather(file_name)
+
+        return file_name
+
+    def SaveWorkbookSheet(self, dataframe, output_folder, table_name):
+
+        """ This method adds table as a new sheet of the workbook of the output folder.
+        :param dataframe: [dataframe] Pandas input object (generated table)
+        :param output_folder: [str] Path to the folder with the workbook
+        :param table_name: [str] Name of the table
+        :return: [str] Path of the workbook and name of the sheet
+        """
+
+        file_name = os.path.join(output_folder, workbook_file_name)
+        if file_name not in self.workbooks:
+            self.workbooks[file_name] = xlsxwriter.Workbook(file_name, {'constant_memory': True})
+        workbook = self.workbooks[file_name]
+
+        # Excel limits the length of sheet name to 31 characters, names have to be unique
+        sheet_name = table_name[:31]
+        sheet_number = 1
+        while workbook.get_worksheet_by_name(sheet_name) is not None:
+            sheet_number += 1
+            suffix = ' ({})'.format(sheet_number)
+            sheet_name = table_name[:31 - len(suffix)] + suffix
+
+        self.WriteSheet(workbook, sheet_name, dataframe)
+        return '{} [{}]'.format(file_name, sheet_name)
+
+    def WriteSheet(self, workbook, sheet_name, dataframe):
+
+        """ This method writes header and rows of the table to the new sheet of the workbook.
+        :param workbook: [xlsxwriter.Workbook] Workbook
+        :param sheet_name: [str] Name of the sheet
+        :param dataframe: [dataframe] Pandas input object (generated table)
+        """
+
+        # Header is bold like in files saved with pandas to_excel
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        worksheet.write_row(0, 0, dataframe.columns.tolist(), workbook.add_format({'bold': True}))
+
+        for row, values in enumerate(GetRows(dataframe), 1):
+            worksheet.write_row(row, 0, values)
+
+    def Close(self):
+
+        """ This method closes all workbooks (workbook format).
+        """
+
+        for workbook in self.workbooks.values():
+            workbook.close()
+        self.workbooks = {}